@@ -1015,7 +1015,7 @@ def analyze_emotion():
         if not image_data:
             return jsonify({'success': False, 'message': 'No image data provided'}), 400
 
-        result = emotion_detector.analyze_emotion_from_base64(image_data)
+        result = emotion_detector.analyze_emotion_from_base64(image_data, stream_id=session.get('user_id'))
         print(f"🔎 analyze result: success={result.get('success')}, msg={result.get('message','')}, emotion={result.get('emotion','')}, attentive={result.get('is_attentive','')}, student={result.get('student_name','')}")
         
         if result['success']:
@@ -5122,6 +5122,10 @@ def senku_start_teaching():
                 yield f'data: {json.dumps({"error": str(e)})}\\n\\n'
                 senku_state['teaching_active'] = False
                 senku_state['current_teacher'] = None
+            finally:
+                # Release the lesson-preparation pool and lesson store now,
+                # not whenever the teacher is garbage-collected
+                teacher.close()
         
         return app.response_class(generate(), mimetype='text/event-stream')
         
@@ -585,6 +585,8 @@ def senku_start_teaching():
                 yield f'data: {json.dumps({"error": str(e)})}\n\n'
                 senku_state['teaching_active'] = False
                 senku_state['current_teacher'] = None
+            finally:
+                teacher.close()
 
         return Response(generate(), mimetype='text/event-stream')
     except Exception as e:
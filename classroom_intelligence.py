@@ -14,7 +14,7 @@ except ImportError:
     print("Warning: utils.emotion_detector not found, using mocks")
     class MockDetector:
         def is_face_recognition_ready(self): return True
-        def identify_face(self, encoding): return "Mock Student", 0.4
+        def identify_face(self, encoding): return "Mock Student", 0.4, 38.46
     emotion_detector = MockDetector()
 
 class StudentState:
@@ -186,7 +186,7 @@ class IntelligenceEngine:
         # Let's assume > 60 is valid based on USER prompt "confidence threshold >= 0.6")
         
         # User prompt says "Match with stored facial embedding... confidence threshold >= 0.6"
-        # emotion_detector.identify_face returns name and distance. 
+        # emotion_detector.identify_face returns name, distance and confidence (0-100). 
         # analyze_emotion returns 'recognition_confidence' (0-100). 
         # So we check if > 60.
         
@@ -306,6 +306,7 @@ def start_teaching(session_id: int, db_path: str = 'auth.db') -> Generator[str,
     """
     global _teaching_state
 
+    teacher = None
     try:
         # Load session data
         conn = sqlite3.connect(db_path)
@@ -387,6 +388,8 @@ def start_teaching(session_id: int, db_path: str = 'auth.db') -> Generator[str,
             _teaching_state['teaching_active'] = False
             _teaching_state['teacher'] = None
             _teaching_state['active_session_id'] = None
+        if teacher is not None:
+            teacher.close()
 
 
 def stop_teaching():
@@ -14,14 +14,23 @@ Features:
 This is NOT a chatbot. This is an autonomous AI teacher.
 """
 
+import collections
+import concurrent.futures
+import functools
 import logging
+import os
+import re
+import sqlite3
+import threading
 import time
 import queue
+import wave
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Generator
+from typing import List, Dict, Optional, Generator, Tuple
 from enum import Enum
 
-from teaching.rag_engine import generate_with_ollama, generate_with_ollama_streaming
+from teaching.rag_engine import OLLAMA_NUM_PARALLEL, generate_with_ollama, generate_with_ollama_streaming
 from teaching.voice_state_manager import (
     VoiceInteractionStateManager,
     InteractionState,
@@ -30,6 +39,16 @@ from teaching.voice_state_manager import (
     attempt_free_memory,
 )
 
+# Optional: token-accurate context truncation
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# How long the first context truncation waits for tiktoken to load its
+# encoding (it downloads it, with no timeout of its own, on a cold cache)
+_TIKTOKEN_LOAD_TIMEOUT = 5.0
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -38,6 +57,36 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _context_encoder():
+    """
+    The cl100k_base tokenizer, loaded on first use.
+    
+    Loading runs in a worker thread that is given _TIKTOKEN_LOAD_TIMEOUT
+    seconds, so an offline server whose tiktoken cache is cold doesn't hang
+    on the download; truncation then falls back to characters for the life
+    of the process.
+    """
+    if tiktoken is None:
+        return None
+    
+    loaded = []
+    
+    def load():
+        try:
+            loaded.append(tiktoken.get_encoding('cl100k_base'))
+        except Exception as e:
+            logger.debug(f"Could not load tiktoken encoding: {e}")
+    
+    worker = threading.Thread(target=load, name='tiktoken-load', daemon=True)
+    worker.start()
+    worker.join(_TIKTOKEN_LOAD_TIMEOUT)
+    if not loaded:
+        logger.info("tiktoken encoding unavailable; truncating context by characters")
+        return None
+    return loaded[0]
+
+
 # ---------------------------------------------------------------------------
 # Q&A MODE — STREAMING SYSTEM PROMPT
 # ---------------------------------------------------------------------------
@@ -65,6 +114,162 @@ STREAMING_QA_SYSTEM_PROMPT = (
 )
 
 
+# Any bracketed marker ([PAUSE], [SHORT PAUSE], [EMPHASIS], [END OF LECTURE],
+# [BREAK], ...) is stripped from display text in a single pass.
+_BRACKETED = re.compile(r'\[[^\]\n]*\]')
+
+# Punctuation left doubled after a reference is removed
+_DUP_PUNCT = re.compile(r'([.,;:!?])\s*([.,;:!?])')
+
+# Sentence boundary for highlighting: terminator, whitespace, then a capital
+# or opening quote (so "e.g. the" and "3.5 m" stay in one sentence)
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z"\'])')
+
+# Silence appended to each sentence WAV: the pause between sentences is part
+# of the audio (synthesized ahead of time) instead of a sleep in the loop
+_SENTENCE_GAP_SECONDS = 0.2
+
+# Code-controlled "Lesson N" header prepended to every lecture
+_LESSON_HEADER = re.compile(r'^Lesson \d+\s*\n+')
+
+# Per-chunk budget for retrieved textbook content (3 chunks ≈ 360 tokens)
+_CONTEXT_CHUNK_TOKENS = 120
+_CONTEXT_CHUNK_CHARS = 450  # fallback when tiktoken is unavailable
+_CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Ollama budget for one lecture: a 600-900 word script (~1200 tokens) plus the
+# prompt fits in 3072 tokens, keeping the KV cache small and output bounded
+_LECTURE_NUM_CTX = 3072
+_LECTURE_NUM_PREDICT = 1200
+
+# How many upcoming lessons are generated ahead of the one being taught
+# (one per Ollama parallel slot; more would only wait on the slots)
+_PREFETCH_DEPTH = OLLAMA_NUM_PARALLEL
+
+# How many opening sentences of a streamed lecture get their audio
+# synthesized while the LLM is still generating the rest
+_STREAM_PREWARM_SENTENCES = 3
+
+
+# Classroom-length spoken lecture script prompt. Everything up to TOPIC is
+# identical for every unit of a session, so Ollama/llama.cpp can reuse the
+# KV cache for that prefix; only the topic and textbook content vary.
+# {greeting} is resolved once per session (see _set_greeting).
+_LECTURE_PROMPT_TEMPLATE = """You are a passionate classroom teacher delivering a full lecture session.
+Create a SPOKEN LECTURE SCRIPT for a 5-8 minute classroom lecture.
+
+CRITICAL LENGTH REQUIREMENT:
+- Target: 600-900 words (5-8 minutes of speaking)
+- This is a FULL classroom lecture, NOT a summary
+- Do NOT make it too short (avoid bullet points)
+- Do NOT make it excessively long (stay focused)
+
+SPOKEN LECTURE SCRIPT FORMAT:
+Write as a SPOKEN script with natural breaks and pacing markers:
+
+Use these markers:
+[PAUSE] - Natural pause for thinking (2-3 seconds)
+[SHORT PAUSE] - Brief pause between ideas (1 second)
+[EMPHASIS] - Emphasize this phrase
+
+Example format:
+"{greeting}, class! [SHORT PAUSE]
+
+Today, we're going to explore something fascinating. [PAUSE]
+
+Now, here's the key question: why does this matter? [PAUSE]
+
+Let me explain. [SHORT PAUSE] First, notice that..."
+
+TEACHING STYLE (CS50-INSPIRED):
+1. Be EXPRESSIVE and PASSIONATE
+2. Use rhetorical questions (no answers required):
+   - "Now, why does this matter?"
+   - "What's really happening here?"
+   - "You might be wondering..."
+3. Explain WHY concepts matter, not just WHAT they are
+4. Anticipate confusion briefly, then clarify
+5. Use conversational language: "we", "let's", "notice that"
+6. Build excitement and curiosity
+7. Make real-world connections
+
+LECTURE STRUCTURE (ESSENTIAL):
+1. OPENING (100-150 words):
+   - Grab attention with a question or interesting fact
+   - Preview what we'll learn today
+   - Build curiosity
+
+2. MAIN EXPLANATION (350-550 words):
+   - Break into 3-4 key ideas
+   - Explain each step-by-step
+   - Use [PAUSE] after important points
+   - Use [SHORT PAUSE] between ideas
+   - Use [EMPHASIS] for key terms
+   - Include rhetorical questions
+   - Anticipate and address confusion
+
+3. CONCLUSION (150-200 words):
+   - Recap the key insights
+   - Explain why this matters
+   - Connect to bigger picture
+   - End with forward-looking statement
+
+PERFORMANCE RULES (CRITICAL):
+- Focus on ESSENTIAL concepts only
+- Do NOT try to explain every detail
+- Prefer clarity over completeness
+- Avoid rambling or repetition
+- Stay within 600-900 words
+
+CRITICAL RULES:
+- DO NOT ask students to respond or answer
+- DO NOT wait for input
+- Teaching must be CONTINUOUS and AUTONOMOUS
+- Use ONLY the textbook content below
+- Target: 600-900 words (count carefully!)
+- DO NOT include headers, lesson numbers, or separators
+- Output ONLY the spoken lecture script
+- Include pacing markers: [PAUSE], [SHORT PAUSE], [EMPHASIS]
+
+TOPIC: {topic}
+
+TEXTBOOK CONTENT:
+{context}
+
+Now, deliver this classroom-length lecture script:"""
+
+
+def _split_sentences(text: str) -> List[str]:
+    """Split display-clean text into the sentences shown and spoken one by one."""
+    return [s.strip() for s in _SENT_SPLIT.split(text) if s.strip()]
+
+
+def _pad_wav_with_silence(wav_path: Path, seconds: float):
+    """Append `seconds` of silence to a PCM WAV file in place."""
+    with wave.open(str(wav_path), 'rb') as src:
+        params = src.getparams()
+        frames = src.readframes(params.nframes)
+    
+    # 8-bit PCM is unsigned (silence = 0x80); wider samples are signed (silence = 0)
+    silence_byte = b'\x80' if params.sampwidth == 1 else b'\x00'
+    pad_frames = int(params.framerate * seconds)
+    
+    with wave.open(str(wav_path), 'wb') as dst:
+        dst.setparams(params)
+        dst.writeframes(frames + silence_byte * (pad_frames * params.sampwidth * params.nchannels))
+
+
+class _FailedLecture(str):
+    """
+    A stand-in lecture returned when generation failed.
+    
+    Still a plain string (it is shown and spoken like any lecture), but
+    flagged with ``is_error`` so it is never cached and a prefetched
+    failure can be retried.
+    """
+    is_error = True
+
+
 class TeachingState(Enum):
     """
     Teaching state for interruption control.
@@ -76,6 +281,17 @@ class TeachingState(Enum):
     INTERRUPTED = "interrupted"
 
 
+@functools.lru_cache(maxsize=1)
+def _greeting_for_hour(hour: int) -> str:
+    """Map an hour of the day (0-23) to its greeting."""
+    if 5 <= hour < 12:
+        return "Good morning"
+    elif 12 <= hour < 17:
+        return "Good afternoon"
+    else:
+        return "Good evening"
+
+
 def get_time_based_greeting() -> str:
     """
     Get appropriate greeting based on current time of day.
@@ -83,16 +299,7 @@ def get_time_based_greeting() -> str:
     Returns:
         Greeting string: "Good morning", "Good afternoon", or "Good evening"
     """
-    from datetime import datetime
-    
-    current_hour = datetime.now().hour
-    
-    if 5 <= current_hour < 12:
-        return "Good morning"
-    elif 12 <= current_hour < 17:
-        return "Good afternoon"
-    else:
-        return "Good evening"
+    return _greeting_for_hour(datetime.now().hour)
 
 
 def chunk_sentence(sentence: str) -> List[str]:
@@ -226,6 +433,13 @@ class AutonomousTeacher:
         self.cache_dir = Path("./data/lectures") / pdf_hash
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
+        # Lesson cache: one SQLite store per PDF, mirrored in memory
+        self._lesson_lock = threading.Lock()
+        self._lesson_db = self._open_lesson_db()
+        self._lessons: Dict[int, str] = dict(
+            self._lesson_db.execute("SELECT unit_num, lecture FROM lessons")
+        )
+        
         # Create output directory (for backward compatibility)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -233,8 +447,21 @@ class AutonomousTeacher:
         self.current_unit = 0
         self.teaching_complete = False
         
+        # Greeting and lecture prompt, resolved once per teaching session
+        self._set_greeting(get_time_based_greeting())
+        
+        # Retrieved textbook context per unit title (filled by _precompute_contexts
+        # and memoized by _retrieve_context)
+        self._context_cache: Dict[str, str] = {}
+        
+        # Shared pool for background lesson preparation (see _fill_prefetch)
+        self._exec = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_PREFETCH_DEPTH, thread_name_prefix='lesson-prep'
+        )
+        
         # Interruption control (Phase 1)
         self.teaching_state = TeachingState.TEACHING
+        self._interrupted = threading.Event()  # Set while INTERRUPTED; wakes playback waits
         self.interrupted_sentence_index = None  # Track which sentence was interrupted
         self.current_sentence_index = 0  # Track current sentence being spoken
         
@@ -509,10 +736,9 @@ class AutonomousTeacher:
         """
         Answer a student question using STREAMING Ollama generation.
 
-        This method is the ONLY place where ``generate_with_ollama_streaming``
-        and ``STREAMING_QA_SYSTEM_PROMPT`` are used.  Lecture generation is
-        completely unaffected — it continues to call ``generate_with_ollama``
-        (non-streaming) via ``_teach_unit`` as before.
+        This method is the ONLY place where ``STREAMING_QA_SYSTEM_PROMPT`` is
+        used.  Lecture generation keeps its own prompt; only the first lesson
+        of a voiced session is streamed (see ``_teach_unit_streaming``).
 
         STREAMING PIPELINE:
         ┌─────────────────────────────────────────────────────────────────┐
@@ -654,58 +880,43 @@ class AutonomousTeacher:
         logger.info("=" * 60)
         
         total_units = len(self.curriculum)
+        self._set_greeting(get_time_based_greeting())
+        self._precompute_contexts()
         
-        # Background preparation using threading
-        import threading
-        
-        next_lecture = None
-        next_lecture_thread = None
-        
-        def prepare_lecture(unit, unit_num, total_units):
-            """Background thread function to prepare next lecture"""
-            nonlocal next_lecture
-            logger.info(f"  🔄 Preparing Lesson {unit_num} in background...")
-            next_lecture = self._teach_unit(unit, unit_num, total_units)
-            logger.info(f"  ✓ Lesson {unit_num} prepared and ready")
+        # Upcoming lessons being prepared in the background (oldest first)
+        pending = collections.deque()
         
         for i, unit in enumerate(self.curriculum, 1):
             logger.info(f"\n📚 Teaching Unit {i}/{total_units}: {unit['title']}")
             
-            # If this is the first lesson, generate it now
+            # If this is the first lesson, generate it now. Its audio is
+            # synthesized sentence by sentence while the lecture streams in.
             if i == 1:
-                lecture = self._teach_unit(unit, i, total_units)
-                self._save_lecture(unit, lecture, i)
+                audio_stream = None
+                if self.voice_enabled and hasattr(self.tts_engine, 'start_lesson_audio_stream'):
+                    audio_stream = self.tts_engine.start_lesson_audio_stream(i)
                 
-                # Start preparing next lesson in background (if exists)
-                if i < total_units:
-                    next_unit = self.curriculum[i]  # i+1 in 0-indexed
-                    next_lecture_thread = threading.Thread(
-                        target=prepare_lecture,
-                        args=(next_unit, i+1, total_units)
-                    )
-                    next_lecture_thread.start()
-                    logger.info(f"  🔄 Started background preparation of Lesson {i+1}")
+                lecture = self._teach_unit(
+                    unit, i, total_units,
+                    on_sentence=audio_stream.push if audio_stream else None
+                )
+                if audio_stream:
+                    audio_stream.finish(lecture)
             else:
                 # Wait for background preparation to complete
-                if next_lecture_thread:
-                    logger.info(f"  ⏳ Waiting for Lesson {i} preparation to complete...")
-                    next_lecture_thread.join()
-                    logger.info(f"  ✓ Lesson {i} ready!")
-                
-                # Use the pre-prepared lecture
-                lecture = next_lecture
-                self._save_lecture(unit, lecture, i)
-                
-                # Start preparing next lesson in background (if exists)
-                if i < total_units:
-                    next_unit = self.curriculum[i]  # i+1 in 0-indexed
-                    next_lecture = None  # Reset
-                    next_lecture_thread = threading.Thread(
-                        target=prepare_lecture,
-                        args=(next_unit, i+1, total_units)
-                    )
-                    next_lecture_thread.start()
-                    logger.info(f"  🔄 Started background preparation of Lesson {i+1}")
+                logger.info(f"  ⏳ Waiting for Lesson {i} preparation to complete...")
+                lecture = self._collect_prefetched(pending.popleft(), unit, i, total_units)
+                logger.info(f"  ✓ Lesson {i} ready!")
+            
+            self._save_lecture(unit, lecture, i)
+            
+            # Keep the next lessons preparing in background (if any), and
+            # render their audio on the TTS process pool as they complete
+            self._fill_prefetch(
+                pending, i, total_units,
+                render_audio=bool(self.voice_enabled and self.tts_engine
+                                  and hasattr(self.tts_engine, 'prefetch_lessons'))
+            )
             
             # Speak the lesson if voice is enabled (CS50-style expressive delivery)
             # While speaking, next lesson is being prepared in background!
@@ -754,15 +965,8 @@ class AutonomousTeacher:
         Returns:
             Clean lecture text suitable for display
         """
-        import re
-        
-        # Remove all bracketed markers (pacing and metadata)
-        clean_text = re.sub(r'\[PAUSE\]', '', lecture, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\[SHORT PAUSE\]', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\[EMPHASIS\]', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\[END OF LECTURE\]', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\[BREAK\]', '', clean_text, flags=re.IGNORECASE)
-        clean_text = re.sub(r'\[.*?\]', '', clean_text)  # Remove any remaining bracketed content
+        # Remove all bracketed markers (pacing and metadata) in one pass
+        clean_text = _BRACKETED.sub('', lecture)
         
         # Remove figure references
         # Patterns: "Fig. 8.22", "Figure 3.5", "see Fig. 10.1", "(Fig. 5.2)", "as shown in Fig. 2.3"
@@ -781,18 +985,73 @@ class AutonomousTeacher:
         clean_text = re.sub(r'(?:see\s+the\s+)(?:image|diagram|illustration|chart|graph)\s+(?:above|below)', '', clean_text, flags=re.IGNORECASE)
         
         # Clean up extra whitespace and punctuation issues that may result from removal
-        clean_text = re.sub(r'\s+', ' ', clean_text)  # Multiple spaces to single
-        clean_text = re.sub(r'\s+([.,;:!?])', r'\1', clean_text)  # Remove space before punctuation
-        clean_text = re.sub(r'([.,;:!?])\s*([.,;:!?])', r'\1', clean_text)  # Remove duplicate punctuation
-        clean_text = re.sub(r'\n\s+\n', '\n\n', clean_text)  # Clean paragraph breaks
-        clean_text = re.sub(r'\n{3,}', '\n\n', clean_text)  # Max 2 newlines
+        # Collapse all whitespace runs to single spaces and trim, in one pass
+        clean_text = ' '.join(clean_text.split())
         
         # Fix sentences that may have become awkward after removal
         # Example: "This is important  ." → "This is important."
-        clean_text = re.sub(r'\s+\.', '.', clean_text)
-        clean_text = re.sub(r'\s+,', ',', clean_text)
+        for p in '.,;:!?':
+            clean_text = clean_text.replace(' ' + p, p)
+        
+        # Removed references can leave doubled punctuation ("important, ." → "important,")
+        clean_text = _DUP_PUNCT.sub(r'\1', clean_text)
+        
+        return clean_text
+    
+    def _prepare_sentence_audio(self, sentence: str, sentence_index: int) -> Tuple[Optional[str], float]:
+        """
+        Generate one sentence WAV for frontend playback.
+        
+        The WAV is saved to web/audio/ so the browser can fetch it.
+        
+        Args:
+            sentence: Sentence text to synthesize
+            sentence_index: Index of the sentence (for logging)
+        
+        Returns:
+            (audio_url, estimated_duration) — audio_url is None if no audio
+            could be generated, in which case a 2s fallback duration is returned
+        """
+        audio_url = None
+        estimated_duration = 2.0  # fallback seconds
+        
+        if self.tts_engine and hasattr(self.tts_engine, 'generate_sentence_wav'):
+            import uuid
+            wav_filename = f"sentence_{uuid.uuid4().hex[:10]}.wav"
+            wav_dir = Path(__file__).parent.parent / "web" / "audio"
+            wav_dir.mkdir(parents=True, exist_ok=True)
+            wav_path = wav_dir / wav_filename
+            
+            success = self.tts_engine.generate_sentence_wav(sentence, wav_path)
+            if success:
+                audio_url = f"/audio/{wav_filename}"
+                # Bake the inter-sentence pause into the audio itself
+                try:
+                    _pad_wav_with_silence(wav_path, _SENTENCE_GAP_SECONDS)
+                except Exception as e:
+                    logger.debug(f"  Could not pad sentence WAV: {e}")
+                # Estimate duration from file size
+                # Piper 16kHz mono 16-bit = 32000 bytes/sec
+                try:
+                    file_size = wav_path.stat().st_size - 44  # minus WAV header
+                    estimated_duration = max(0.5, file_size / 32000)
+                except Exception:
+                    # Fallback: ~150 WPM = 0.4s per word
+                    word_count = len(sentence.split())
+                    estimated_duration = max(1.0, word_count * 0.4)
+                logger.debug(f"  🔊 Sentence WAV: {wav_filename} ({estimated_duration:.1f}s)")
+            else:
+                logger.warning(f"  ⚠️ Failed to generate WAV for sentence {sentence_index+1}")
         
-        return clean_text.strip()
+        return audio_url, estimated_duration
+    
+    def _discard_prewarmed_audio(self, prewarmed_audio: Dict[str, Tuple[Optional[str], float]]):
+        """Delete sentence WAVs synthesized during streaming that were never played."""
+        wav_dir = Path(__file__).parent.parent / "web" / "audio"
+        for audio_url, _ in list(prewarmed_audio.values()):
+            if audio_url:
+                (wav_dir / Path(audio_url).name).unlink(missing_ok=True)
+        prewarmed_audio.clear()
     
     def teach_entire_curriculum_with_highlighting(self) -> Generator[Dict[str, any], None, None]:
         """
@@ -844,94 +1103,45 @@ class AutonomousTeacher:
                 logger.info("Teaching will continue without wake-word detection")
         
         total_units = len(self.curriculum)
+        self._set_greeting(get_time_based_greeting())
+        self._precompute_contexts()
         
-        # Background generation state
-        next_lecture = None
-        next_lecture_ready = threading.Event()
-        generation_error = None
-        
-        def generate_next_lesson(unit, unit_num, total_units):
-            """Background thread function to generate next lesson"""
-            nonlocal next_lecture, generation_error
-            try:
-                logger.info(f"🧵 Background: Generating lesson {unit_num}")
-                next_lecture = self._teach_unit(unit, unit_num, total_units)
-                logger.info(f"✓ Background: Lesson {unit_num} cached")
-                next_lecture_ready.set()
-            except Exception as e:
-                logger.error(f"✗ Background generation failed for lesson {unit_num}: {e}")
-                generation_error = e
-                next_lecture_ready.set()
+        # Upcoming lessons being generated in the background (oldest first)
+        pending = collections.deque()
         
         for i, unit in enumerate(self.curriculum, 1):
             logger.info(f"\n📚 Teaching Unit {i}/{total_units}: {unit['title']}")
             
+            # Sentence audio synthesized while the lecture was still streaming
+            prewarmed_audio = {}
+            
             # STEP 1: Get current lesson
             if i == 1:
-                # First lesson - generate synchronously
-                lecture = self._teach_unit(unit, i, total_units)
+                # First lesson - generate synchronously. With voice enabled, stream
+                # it so the opening sentences are voiced while the LLM keeps writing.
+                if self.voice_enabled and self.tts_engine:
+                    lecture = self._teach_unit_streaming(unit, i, total_units, prewarmed_audio)
+                else:
+                    lecture = self._teach_unit(unit, i, total_units)
             else:
                 # Wait for background generation to complete
                 logger.info(f"📚 Loading cached lesson {i}")
-                next_lecture_ready.wait()
-                
-                if generation_error:
-                    logger.error(f"Using fallback for lesson {i} due to background error")
-                    lecture = self._teach_unit(unit, i, total_units)
-                    generation_error = None
-                else:
-                    lecture = next_lecture
-                
-                # Reset for next iteration
-                next_lecture = None
-                next_lecture_ready.clear()
+                lecture = self._collect_prefetched(pending.popleft(), unit, i, total_units)
             
             # Save lecture
             self._save_lecture(unit, lecture, i)
             
-            # STEP 2: Start background generation of NEXT lesson (if exists)
-            if i < total_units:
-                next_unit = self.curriculum[i]  # i+1 in 0-indexed
-                
-                # Check if next lesson is already cached
-                cache_file = self.cache_dir / f"lesson_{i+1}.txt"
-                if not cache_file.exists():
-                    # Start background thread to generate next lesson
-                    bg_thread = threading.Thread(
-                        target=generate_next_lesson,
-                        args=(next_unit, i+1, total_units),
-                        daemon=True
-                    )
-                    bg_thread.start()
-                else:
-                    # Next lesson already cached - load it in background
-                    def load_cached():
-                        nonlocal next_lecture
-                        try:
-                            next_lecture = cache_file.read_text(encoding='utf-8')
-                            logger.info(f"📚 Loading cached lesson {i+1}")
-                            next_lecture_ready.set()
-                        except Exception as e:
-                            logger.error(f"Failed to load cache: {e}")
-                            generation_error = e
-                            next_lecture_ready.set()
-                    
-                    bg_thread = threading.Thread(target=load_cached, daemon=True)
-                    bg_thread.start()
+            # STEP 2: Start background generation of the NEXT lessons (if any)
+            # Cached lessons resolve immediately inside _teach_unit
+            self._fill_prefetch(pending, i, total_units)
             
             # Get sentences for highlighting
             # IMPORTANT: Always extract sentences, even if voice is disabled
             # The frontend needs this for proper display
-            sentences = []
-            if self.tts_engine:
+            sentences = _split_sentences(self._clean_lecture_for_display(_LESSON_HEADER.sub('', lecture)))
+            if not sentences and self.tts_engine:
+                # Fallback: TTS engine's own splitter
                 sentences = self.tts_engine.get_sentences(lecture)
-            else:
-                # Fallback: Simple sentence splitting when TTS is disabled
-                import re
-                clean_text = self._clean_lecture_for_display(lecture)
-                # Split on sentence boundaries
-                sentences = re.split(r'(?<=[.!?])\s+', clean_text)
-                sentences = [s.strip() for s in sentences if s.strip()]
             
             # Yield lesson start
             yield {
@@ -947,6 +1157,49 @@ class AutonomousTeacher:
             
             # STEP 3: Speak the lesson (while next lesson generates in background!)
             if self.voice_enabled and self.tts_engine:
+                # Sentence WAVs are synthesized by a producer thread one or two
+                # sentences ahead of playback, so TTS overlaps with listening.
+                audio_queue = queue.Queue(maxsize=2)
+                stop_audio_producer = threading.Event()
+                prepared_audio = {}
+                producer_done = False
+                
+                def produce_sentence_audio(sentences=sentences):
+                    """Background thread: synthesize sentence audio in order."""
+                    def put(item):
+                        while not stop_audio_producer.is_set():
+                            try:
+                                audio_queue.put(item, timeout=0.1)
+                                return
+                            except queue.Full:
+                                continue
+                    
+                    for sentence_idx, sentence_text in enumerate(sentences):
+                        if stop_audio_producer.is_set():
+                            return
+                        if sentence_text.strip():
+                            try:
+                                prepared = prewarmed_audio.pop(sentence_text, None) \
+                                    or self._prepare_sentence_audio(sentence_text, sentence_idx)
+                            except Exception as e:
+                                logger.warning(f"  ⚠️ Sentence audio failed for sentence {sentence_idx+1}: {e}")
+                                prepared = (None, 2.0)
+                            put((sentence_idx, prepared))
+                    put(None)  # Sentinel: no more sentences
+                
+                def next_sentence_audio(sentence_idx):
+                    """Block until audio for ``sentence_idx`` is ready."""
+                    nonlocal producer_done
+                    while sentence_idx not in prepared_audio and not producer_done:
+                        item = audio_queue.get()
+                        if item is None:
+                            producer_done = True
+                        else:
+                            prepared_audio[item[0]] = item[1]
+                    return prepared_audio.get(sentence_idx, (None, 2.0))
+                
+                threading.Thread(target=produce_sentence_audio, daemon=True).start()
+                
                 try:
                     if i < total_units:
                         logger.info(f"🔊 Speaking lesson {i} (background generation running)")
@@ -964,10 +1217,6 @@ class AutonomousTeacher:
                     
                     # For now, we'll use the simpler approach of yielding before speaking
                     # The UI will handle highlighting based on timing
-                    import time
-                    
-                    # Introduce the lesson
-                    time.sleep(1.0)
                     
                     # Speak each sentence and yield progress
                     # PHASE 1 INTERRUPTION: Chunk-based playback for responsive stopping
@@ -1018,33 +1267,9 @@ class AutonomousTeacher:
                             
                             # Yield sentence start (for bold highlighting)
                             # ── FRONTEND AUDIO PLAYBACK ──
-                            # Generate one WAV per sentence, save to web/audio/,
-                            # include audio_url so the browser fetches + plays it.
-                            audio_url = None
-                            estimated_duration = 2.0  # fallback seconds
-                            
-                            if self.tts_engine and hasattr(self.tts_engine, 'generate_sentence_wav'):
-                                import uuid
-                                wav_filename = f"sentence_{uuid.uuid4().hex[:10]}.wav"
-                                wav_dir = Path(__file__).parent.parent / "web" / "audio"
-                                wav_dir.mkdir(parents=True, exist_ok=True)
-                                wav_path = wav_dir / wav_filename
-                                
-                                success = self.tts_engine.generate_sentence_wav(sentence, wav_path)
-                                if success:
-                                    audio_url = f"/audio/{wav_filename}"
-                                    # Estimate duration from file size
-                                    # Piper 16kHz mono 16-bit = 32000 bytes/sec
-                                    try:
-                                        file_size = wav_path.stat().st_size - 44  # minus WAV header
-                                        estimated_duration = max(0.5, file_size / 32000)
-                                    except Exception:
-                                        # Fallback: ~150 WPM = 0.4s per word
-                                        word_count = len(sentence.split())
-                                        estimated_duration = max(1.0, word_count * 0.4)
-                                    logger.debug(f"  🔊 Sentence WAV: {wav_filename} ({estimated_duration:.1f}s)")
-                                else:
-                                    logger.warning(f"  ⚠️ Failed to generate WAV for sentence {idx+1}")
+                            # The producer thread has (usually) already written this
+                            # sentence's WAV; the browser fetches + plays audio_url.
+                            audio_url, estimated_duration = next_sentence_audio(idx)
                             
                             yield {
                                 'type': 'sentence_start',
@@ -1081,7 +1306,8 @@ class AutonomousTeacher:
                                         self.qa_is_playing_audio = False
                                     except queue.Empty:
                                         pass
-                                    time.sleep(0.1)  # 100ms polling
+                                    # Sleep until the sentence ends; interrupt() wakes us at once
+                                    self._interrupted.wait(timeout=max(0.0, wait_end - time.time()))
                             else:
                                 # No audio — just pause briefly for text display
                                 time.sleep(0.5)
@@ -1133,16 +1359,17 @@ class AutonomousTeacher:
                                 'progress': f"{i}/{total_units}",
                                 'is_complete': False
                             }
-                            
-                            # Small pause between sentences
-                            time.sleep(0.2)
                         
                         # Move to next sentence
+                        prepared_audio.pop(idx, None)
                         idx += 1
                     
                 except Exception as e:
                     logger.error(f"  ✗ Voice output failed: {e}")
                     logger.info("  Continuing without voice...")
+                finally:
+                    stop_audio_producer.set()
+                    self._discard_prewarmed_audio(prewarmed_audio)
             
             # Yield lesson end
             yield {
@@ -1188,7 +1415,147 @@ class AutonomousTeacher:
         logger.info("✅ AUTONOMOUS TEACHING SESSION COMPLETE")
         logger.info("=" * 60)
     
-    def _teach_unit(self, unit: Dict[str, str], unit_num: int, total_units: int) -> str:
+    def _open_lesson_db(self) -> sqlite3.Connection:
+        """
+        Open (or create) this PDF's lesson store.
+        
+        On first open, lectures cached by older versions as lesson_N.txt
+        files are imported once.
+        
+        Returns:
+            SQLite connection shared by the teaching and prefetch threads
+        """
+        conn = sqlite3.connect(str(self.cache_dir / 'lessons.db'), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS lessons ("
+            "unit_num INTEGER PRIMARY KEY, lecture TEXT NOT NULL)"
+        )
+        
+        if conn.execute("SELECT COUNT(*) FROM lessons").fetchone()[0] == 0:
+            rows = []
+            for path in self.cache_dir.glob("lesson_*.txt"):
+                try:
+                    rows.append((int(path.stem.split('_', 1)[1]), path.read_text(encoding='utf-8')))
+                except (ValueError, OSError) as e:
+                    logger.warning(f"  ⚠️ Skipping legacy cache file {path.name}: {e}")
+            if rows:
+                conn.executemany("INSERT OR REPLACE INTO lessons VALUES (?, ?)", rows)
+                logger.info(f"  📦 Migrated {len(rows)} cached lectures into lessons.db")
+        
+        conn.commit()
+        return conn
+    
+    def _get_cached_lesson(self, unit_num: int) -> Optional[str]:
+        """
+        Look up a cached lecture.
+        
+        Served from memory; falls back to the store in case another session
+        for the same PDF cached it since we opened.
+        """
+        lecture = self._lessons.get(unit_num)
+        if lecture is None:
+            with self._lesson_lock:
+                if self._lesson_db is None:
+                    return None
+                row = self._lesson_db.execute(
+                    "SELECT lecture FROM lessons WHERE unit_num = ?", (unit_num,)
+                ).fetchone()
+            if row:
+                lecture = self._lessons[unit_num] = row[0]
+        return lecture
+    
+    def _cache_lesson(self, unit_num: int, lecture: str):
+        """Persist a generated lecture to the lesson store (kept in memory only once closed)."""
+        with self._lesson_lock:
+            self._lessons[unit_num] = lecture
+            if self._lesson_db is None:
+                return
+            self._lesson_db.execute(
+                "INSERT OR REPLACE INTO lessons VALUES (?, ?)", (unit_num, lecture)
+            )
+            self._lesson_db.commit()
+    
+    def _fill_prefetch(
+        self,
+        pending: collections.deque,
+        unit_num: int,
+        total_units: int,
+        render_audio: bool = False
+    ):
+        """
+        Keep up to _PREFETCH_DEPTH upcoming lessons generating in the background.
+        
+        Args:
+            pending: Futures for the lessons after unit_num, oldest first
+            unit_num: Lesson currently being taught
+            total_units: Total number of units
+            render_audio: Also pre-render each lesson's audio once its text is
+                ready (lesson-level playback in teach_entire_curriculum)
+        """
+        next_num = unit_num + len(pending) + 1
+        while len(pending) < _PREFETCH_DEPTH and next_num <= total_units:
+            logger.info(f"  🔄 Started background preparation of Lesson {next_num}")
+            future = self._exec.submit(
+                self._teach_unit, self.curriculum[next_num - 1], next_num, total_units
+            )
+            if render_audio:
+                future.add_done_callback(
+                    lambda f, n=next_num: self._prerender_lesson_audio(f, n)
+                )
+            pending.append(future)
+            next_num += 1
+    
+    def _prerender_lesson_audio(self, future: concurrent.futures.Future, unit_num: int):
+        """Hand a freshly prepared lecture to the TTS engine's audio prefetch (done-callback)."""
+        try:
+            lecture = future.result()
+            if lecture and not getattr(lecture, 'is_error', False):
+                self.tts_engine.prefetch_lessons([(unit_num, lecture)])
+        except Exception as e:
+            logger.debug(f"  Audio pre-render skipped for lesson {unit_num}: {e}")
+    
+    def _collect_prefetched(
+        self,
+        future: concurrent.futures.Future,
+        unit: Dict[str, str],
+        unit_num: int,
+        total_units: int
+    ) -> str:
+        """
+        Wait for a prefetched lesson, regenerating it if preparation failed.
+        
+        A background exception or a failed lecture (e.g. Ollama timeout)
+        gets one synchronous retry, so a single hiccup doesn't leave the
+        student with an error lesson while later prefetches stay warm.
+        
+        Args:
+            future: Future returned by _fill_prefetch for this unit
+            unit: Curriculum unit dict
+            unit_num: Current unit number
+            total_units: Total number of units
+        
+        Returns:
+            Lecture text (a failed-lecture message only if the retry failed too)
+        """
+        try:
+            lecture = future.result()
+        except Exception as e:
+            logger.error(f"✗ Background generation failed for lesson {unit_num}: {e}")
+            lecture = None
+        
+        if lecture is None or getattr(lecture, 'is_error', False):
+            logger.error(f"Using fallback for lesson {unit_num} due to background error")
+            lecture = self._teach_unit(unit, unit_num, total_units)
+        
+        return lecture
+    
+    def _teach_unit(
+        self,
+        unit: Dict[str, str],
+        unit_num: int,
+        total_units: int,
+        on_sentence=None
+    ) -> str:
         """
         Teach a single curriculum unit.
         
@@ -1201,6 +1568,7 @@ class AutonomousTeacher:
             unit: Curriculum unit dict
             unit_num: Current unit number
             total_units: Total number of units
+            on_sentence: Optional callback for each sentence as it is generated
         
         Returns:
             Generated or cached lecture text
@@ -1208,16 +1576,13 @@ class AutonomousTeacher:
         unit_title = unit['title']
         
         # Check cache first
-        cache_file = self.cache_dir / f"lesson_{unit_num}.txt"
-        
-        if cache_file.exists():
-            logger.info(f"  📦 Loading cached lecture: {cache_file.name}")
-            try:
-                cached_lecture = cache_file.read_text(encoding='utf-8')
-                logger.info(f"  ✓ Cached lecture loaded ({len(cached_lecture)} chars)")
+        try:
+            cached_lecture = self._get_cached_lesson(unit_num)
+            if cached_lecture is not None:
+                logger.info(f"  📦 Loaded cached lecture: lesson {unit_num} ({len(cached_lecture)} chars)")
                 return cached_lecture
-            except Exception as e:
-                logger.warning(f"  ⚠️ Failed to load cache: {e}. Regenerating...")
+        except Exception as e:
+            logger.warning(f"  ⚠️ Failed to load cache: {e}. Regenerating...")
         
         # Cache miss - generate new lecture
         try:
@@ -1231,22 +1596,200 @@ class AutonomousTeacher:
             else:
                 # Step 2: Generate human-like lecture
                 logger.info(f"  🎓 Generating lecture...")
-                lecture = self._generate_teacher_lecture(unit_title, context, unit_num, total_units)
+                lecture = self._generate_teacher_lecture(
+                    unit_title, context, unit_num, total_units, on_sentence=on_sentence
+                )
                 logger.info(f"  ✓ Lecture generated ({len(lecture)} chars)")
             
-            # Step 3: Save to cache
+            # Step 3: Save to cache (failed generations are retried next time)
+            if not getattr(lecture, 'is_error', False):
+                try:
+                    self._cache_lesson(unit_num, lecture)
+                    logger.info(f"  💾 Cached lecture: lesson {unit_num}")
+                except Exception as e:
+                    logger.warning(f"  ⚠️ Failed to cache lecture: {e}")
+            
+            return lecture
+            
+        except Exception as e:
+            logger.error(f"  ✗ Error teaching unit: {e}")
+            return _FailedLecture(f"Error teaching {unit_title}: {str(e)}")
+
+    
+    def _teach_unit_streaming(
+        self,
+        unit: Dict[str, str],
+        unit_num: int,
+        total_units: int,
+        prewarmed_audio: Dict[str, Tuple[Optional[str], float]]
+    ) -> str:
+        """
+        Teach a single unit, streaming the lecture from Ollama.
+        
+        Behaves like _teach_unit(), but tokens are consumed as they arrive.
+        Each completed sentence is split/cleaned exactly like the sentences
+        shown to the student, and the first few are handed to a TTS worker
+        so their audio is ready by the time the lecture is complete.
+        
+        The lecture is only cached once the stream finishes successfully.
+        
+        Args:
+            unit: Curriculum unit dict
+            unit_num: Current unit number
+            total_units: Total number of units
+            prewarmed_audio: Filled with {clean sentence: (audio_url, duration)}
+        
+        Returns:
+            Generated or cached lecture text
+        """
+        unit_title = unit['title']
+        
+        try:
+            if self._get_cached_lesson(unit_num) is not None:
+                return self._teach_unit(unit, unit_num, total_units)
+            
+            logger.info(f"  📖 Retrieving content for: {unit_title}")
+            context = self._retrieve_context(unit_title)
+            if not context:
+                return self._teach_unit(unit, unit_num, total_units)
+            
+            prompt = self._build_lecture_prompt(unit_title, context)
+            
+            # TTS worker for the opening sentences
+            tts_queue = queue.Queue()
+            
+            def prewarm_worker():
+                while True:
+                    sentence_text = tts_queue.get()
+                    if sentence_text is None:
+                        return
+                    try:
+                        prewarmed_audio[sentence_text] = self._prepare_sentence_audio(
+                            sentence_text, len(prewarmed_audio)
+                        )
+                    except Exception as e:
+                        logger.debug(f"  Prewarm audio failed: {e}")
+            
+            worker = threading.Thread(target=prewarm_worker, daemon=True)
+            worker.start()
+            
+            logger.info(f"  🎓 Streaming lecture...")
+            tokens = []
+            buffer = ""
+            queued = 0
+            try:
+                for token in generate_with_ollama_streaming(
+                    prompt, model=self.ollama_model,
+                    num_ctx=_LECTURE_NUM_CTX, num_predict=_LECTURE_NUM_PREDICT
+                ):
+                    tokens.append(token)
+                    if queued >= _STREAM_PREWARM_SENTENCES:
+                        continue
+                    
+                    buffer += token
+                    *complete, buffer = _SENT_SPLIT.split(buffer)
+                    for raw_sentence in complete:
+                        for sentence_text in _split_sentences(self._clean_lecture_for_display(raw_sentence)):
+                            if queued < _STREAM_PREWARM_SENTENCES:
+                                tts_queue.put(sentence_text)
+                                queued += 1
+            except Exception as e:
+                logger.warning(f"Lecture generation failed for '{unit_title}': {e}")
+                # The fallback message won't use the opening sentences' audio
+                tts_queue.put(None)
+                worker.join()
+                self._discard_prewarmed_audio(prewarmed_audio)
+                return self._generate_timeout_message(unit_title, unit_num, total_units)
+            tts_queue.put(None)
+            
+            lecture = f"Lesson {unit_num}\n\n" + "".join(tokens).strip()
+            logger.info(f"  ✓ Lecture streamed ({len(lecture)} chars)")
+            
+            # Stream completed - now safe to cache
             try:
-                cache_file.write_text(lecture, encoding='utf-8')
-                logger.info(f"  💾 Cached lecture: {cache_file.name}")
+                self._cache_lesson(unit_num, lecture)
+                logger.info(f"  💾 Cached lecture: lesson {unit_num}")
             except Exception as e:
                 logger.warning(f"  ⚠️ Failed to cache lecture: {e}")
             
+            worker.join()
             return lecture
             
         except Exception as e:
             logger.error(f"  ✗ Error teaching unit: {e}")
-            return f"Error teaching {unit_title}: {str(e)}"
-
+            return _FailedLecture(f"Error teaching {unit_title}: {str(e)}")
+    
+    def _precompute_contexts(self, top_k: int = 3):
+        """
+        Retrieve textbook context for every uncached unit up front.
+        
+        All unit titles are embedded in one batch and searched with a single
+        batched vector query, instead of one embedding call and one search per
+        unit. Results are stored in self._context_cache, which
+        _retrieve_context() consults first.
+        
+        Units whose lecture is already cached on disk are skipped. Any failure
+        here is non-fatal: _retrieve_context() falls back to per-unit retrieval.
+        
+        Args:
+            top_k: Number of chunks to retrieve per unit (default: 3)
+        """
+        titles = [
+            unit['title']
+            for unit_num, unit in enumerate(self.curriculum, 1)
+            if unit['title'] not in self._context_cache
+            and self._get_cached_lesson(unit_num) is None
+        ]
+        if not titles:
+            return
+        
+        try:
+            embeddings = self.embedding_gen.generate_embeddings_batch_cached(titles, show_progress=False)
+            pairs = [(title, emb) for title, emb in zip(titles, embeddings) if emb]
+            if not pairs:
+                return
+            
+            batched_results = self.vector_db.similarity_search_batch(
+                [emb for _, emb in pairs], top_k=top_k
+            )
+            for (title, _), results in zip(pairs, batched_results):
+                self._context_cache[title] = self._format_context(results)
+            
+            logger.info(f"  Precomputed context for {len(pairs)} units")
+            
+        except Exception as e:
+            logger.warning(f"Context precomputation failed: {e}. Retrieving per unit instead.")
+    
+    def _format_context(self, results) -> str:
+        """
+        Combine similarity search results into a prompt-sized context string.
+        
+        Args:
+            results: List of (text, score, metadata) tuples
+        
+        Returns:
+            Combined context text (truncated for optimal Ollama performance)
+        """
+        if not results:
+            return ""
+        
+        # Combine chunks with truncation to prevent timeout
+        chunks = []
+        for text, _, _ in results:
+            # Truncate each chunk to a fixed token budget to keep context predictable
+            enc = _context_encoder()
+            if enc is not None:
+                tokens = enc.encode(text)
+                truncated = enc.decode(tokens[:_CONTEXT_CHUNK_TOKENS]) if len(tokens) > _CONTEXT_CHUNK_TOKENS else text
+            else:
+                truncated = text[:_CONTEXT_CHUNK_CHARS]
+            chunks.append(truncated)
+        
+        combined_context = _CONTEXT_SEPARATOR.join(chunks)
+        
+        logger.info(f"  Retrieved {len(chunks)} chunks, total context: {len(combined_context)} chars")
+        
+        return combined_context
     
     def _retrieve_context(self, topic: str, top_k: int = 3) -> str:
         """
@@ -1264,9 +1807,14 @@ class AutonomousTeacher:
         Returns:
             Combined context text (truncated for optimal Ollama performance)
         """
+        # Precomputed by _precompute_contexts() at session start, or
+        # memoized from an earlier call below
+        if topic in self._context_cache:
+            return self._context_cache[topic]
+        
         try:
             # Generate query embedding
-            query_embedding = self.embedding_gen.generate_embedding(topic)
+            query_embedding = self.embedding_gen.generate_embedding_cached(topic)
             
             if not query_embedding:
                 return ""
@@ -1274,32 +1822,48 @@ class AutonomousTeacher:
             # Search vector database (reduced top_k for smaller context)
             results = self.vector_db.similarity_search(query_embedding, top_k=top_k)
             
-            if not results:
-                return ""
-            
-            # Combine chunks with truncation to prevent timeout
-            chunks = []
-            for text, _, _ in results:
-                # Truncate each chunk to ~450 characters to keep context manageable
-                truncated = text[:450] if len(text) > 450 else text
-                chunks.append(truncated)
+            context = self._format_context(results)
             
-            combined_context = "\n\n---\n\n".join(chunks)
+            # Memoize so a retry or a re-taught unit skips the search
+            if context:
+                self._context_cache[topic] = context
             
-            logger.info(f"  Retrieved {len(chunks)} chunks, total context: {len(combined_context)} chars")
-            
-            return combined_context
+            return context
             
         except Exception as e:
             logger.error(f"Retrieval failed: {e}")
             return ""
     
+    def _set_greeting(self, greeting: str):
+        """
+        Resolve the session greeting into the lecture prompt template.
+        
+        Args:
+            greeting: "Good morning", "Good afternoon", or "Good evening"
+        """
+        self._greeting = greeting
+        self._prompt_template = _LECTURE_PROMPT_TEMPLATE.replace('{greeting}', greeting)
+    
+    def _build_lecture_prompt(self, topic: str, context: str) -> str:
+        """
+        Build the classroom-length lecture prompt for a topic.
+        
+        Args:
+            topic: Topic/chapter title
+            context: Retrieved textbook content
+        
+        Returns:
+            Prompt string for Ollama
+        """
+        return self._prompt_template.format(topic=topic, context=context)
+    
     def _generate_teacher_lecture(
         self,
         topic: str,
         context: str,
         unit_num: int,
-        total_units: int
+        total_units: int,
+        on_sentence=None
     ) -> str:
         """
         Generate a classroom-length spoken lecture script using Ollama.
@@ -1324,100 +1888,29 @@ class AutonomousTeacher:
             context: Retrieved textbook content
             unit_num: Current unit number
             total_units: Total units in curriculum
+            on_sentence: Optional callback for each sentence as Ollama streams it
         
         Returns:
             Generated lecture text (or friendly error message if timeout)
         """
-        # CLASSROOM-LENGTH SPOKEN LECTURE SCRIPT PROMPT
-        # Get time-appropriate greeting
-        greeting = get_time_based_greeting()
+        prompt = self._build_lecture_prompt(topic, context)
+        
+        def shorter_prompt(attempt: int) -> str:
+            # Halve the retrieved chunks per retry, keeping the best-ranked ones
+            chunks = context.split(_CONTEXT_SEPARATOR)
+            kept = chunks[:max(1, len(chunks) >> attempt)]
+            return self._build_lecture_prompt(topic, _CONTEXT_SEPARATOR.join(kept))
         
-        prompt = f"""You are a passionate classroom teacher delivering a full lecture session.
-Create a SPOKEN LECTURE SCRIPT for a 5-8 minute classroom lecture.
-
-TOPIC: {topic}
-
-TEXTBOOK CONTENT:
-{context}
-
-CRITICAL LENGTH REQUIREMENT:
-- Target: 600-900 words (5-8 minutes of speaking)
-- This is a FULL classroom lecture, NOT a summary
-- Do NOT make it too short (avoid bullet points)
-- Do NOT make it excessively long (stay focused)
-
-SPOKEN LECTURE SCRIPT FORMAT:
-Write as a SPOKEN script with natural breaks and pacing markers:
-
-Use these markers:
-[PAUSE] - Natural pause for thinking (2-3 seconds)
-[SHORT PAUSE] - Brief pause between ideas (1 second)
-[EMPHASIS] - Emphasize this phrase
-
-Example format:
-"{greeting}, class! [SHORT PAUSE]
-
-Today, we're going to explore something fascinating. [PAUSE]
-
-Now, here's the key question: why does this matter? [PAUSE]
-
-Let me explain. [SHORT PAUSE] First, notice that..."
-
-TEACHING STYLE (CS50-INSPIRED):
-1. Be EXPRESSIVE and PASSIONATE
-2. Use rhetorical questions (no answers required):
-   - "Now, why does this matter?"
-   - "What's really happening here?"
-   - "You might be wondering..."
-3. Explain WHY concepts matter, not just WHAT they are
-4. Anticipate confusion briefly, then clarify
-5. Use conversational language: "we", "let's", "notice that"
-6. Build excitement and curiosity
-7. Make real-world connections
-
-LECTURE STRUCTURE (ESSENTIAL):
-1. OPENING (100-150 words):
-   - Grab attention with a question or interesting fact
-   - Preview what we'll learn today
-   - Build curiosity
-
-2. MAIN EXPLANATION (350-550 words):
-   - Break into 3-4 key ideas
-   - Explain each step-by-step
-   - Use [PAUSE] after important points
-   - Use [SHORT PAUSE] between ideas
-   - Use [EMPHASIS] for key terms
-   - Include rhetorical questions
-   - Anticipate and address confusion
-
-3. CONCLUSION (150-200 words):
-   - Recap the key insights
-   - Explain why this matters
-   - Connect to bigger picture
-   - End with forward-looking statement
-
-PERFORMANCE RULES (CRITICAL):
-- Focus on ESSENTIAL concepts only
-- Do NOT try to explain every detail
-- Prefer clarity over completeness
-- Avoid rambling or repetition
-- Stay within 600-900 words
-
-CRITICAL RULES:
-- DO NOT ask students to respond or answer
-- DO NOT wait for input
-- Teaching must be CONTINUOUS and AUTONOMOUS
-- Use ONLY the textbook content above
-- Target: 600-900 words (count carefully!)
-- DO NOT include headers, lesson numbers, or separators
-- Output ONLY the spoken lecture script
-- Include pacing markers: [PAUSE], [SHORT PAUSE], [EMPHASIS]
-
-Now, deliver this classroom-length lecture script:"""
-
         try:
             # Generate with Ollama
-            lecture_content = generate_with_ollama(prompt, model=self.ollama_model)
+            lecture_content = generate_with_ollama(
+                prompt,
+                model=self.ollama_model,
+                on_sentence=on_sentence,
+                retry_prompt=shorter_prompt,
+                num_ctx=_LECTURE_NUM_CTX,
+                num_predict=_LECTURE_NUM_PREDICT
+            )
             
             # Add clean header (controlled by code, not LLM)
             header = f"Lesson {unit_num}\n\n"
@@ -1437,8 +1930,9 @@ Now, deliver this classroom-length lecture script:"""
         Generate a friendly teacher-style message when Ollama times out.
         
         This allows teaching to continue gracefully instead of crashing.
+        The message is flagged as a failed lecture so it is not cached.
         """
-        return f"""Lesson {unit_num}
+        return _FailedLecture(f"""Lesson {unit_num}
 
 Hello students! I apologize, but I'm having some difficulty preparing 
 this particular lesson on "{topic}" right now. The content might be 
@@ -1457,7 +1951,7 @@ Let's continue with our next lesson.
 Note: This topic may require breaking down into smaller sub-topics 
 for better teaching. You can try requesting this topic specifically 
 in the topic-based tutor mode (python app.py) for a more focused 
-explanation."""
+explanation.""")
 
     
     def _generate_no_content_message(self, topic: str, unit_num: int, total_units: int) -> str:
@@ -1489,8 +1983,11 @@ Let's move on to the next lesson."""
             filename = f"{unit_num:02d}_{safe_title}.txt"
             filepath = self.output_dir / filename
             
-            # Save lecture
-            filepath.write_text(lecture, encoding='utf-8')
+            # Save lecture (temp file + rename, so a crash never leaves a partial file)
+            partial = filepath.with_name(filepath.name + ".part")
+            with open(partial, 'wb', buffering=131072) as f:
+                f.write(lecture.encode('utf-8'))
+            os.replace(partial, filepath)
             
         except Exception as e:
             logger.error(f"Failed to save lecture: {e}")
@@ -1544,6 +2041,7 @@ Let's move on to the next lesson."""
             import pygame
             if pygame.mixer.get_init():  # Check if mixer is initialized
                 pygame.mixer.music.stop()
+                pygame.mixer.stop()
                 logger.info("  ✓ Pygame audio stopped (failsafe)")
         except Exception as e:
             logger.debug(f"  Pygame failsafe stop failed (may not be initialized): {e}")
@@ -1558,6 +2056,7 @@ Let's move on to the next lesson."""
         
         # Update state (teaching loop will detect this and break out of playback)
         self.teaching_state = TeachingState.INTERRUPTED
+        self._interrupted.set()
         logger.info("  ✓ State: INTERRUPTED (Piper process preserved)")
     
     
@@ -1593,6 +2092,7 @@ Let's move on to the next lesson."""
         
         # Update state
         self.teaching_state = TeachingState.TEACHING
+        self._interrupted.clear()
         logger.info("  ✓ State: TEACHING")
         
         # Reset wake-word detector debounce to allow next detection
@@ -1655,6 +2155,7 @@ Let's move on to the next lesson."""
             import pygame
             if pygame.mixer.get_init():
                 pygame.mixer.music.stop()
+                pygame.mixer.stop()
                 logger.info("  ✓ Pygame audio stopped (failsafe)")
         except Exception as e:
             logger.debug(f"  Pygame failsafe stop failed: {e}")
@@ -1669,8 +2170,28 @@ Let's move on to the next lesson."""
         
         # Update state
         self.teaching_state = TeachingState.INTERRUPTED
+        self._interrupted.set()
         self.teaching_complete = True
         logger.info("  ✓ Teaching session ended")
+    
+    def close(self):
+        """
+        Release the background lesson-preparation pool and the lesson store.
+        
+        Lessons still queued are cancelled. One already talking to Ollama
+        finishes on its own, but is no longer written to the store.
+        """
+        self._exec.shutdown(wait=False, cancel_futures=True)
+        with self._lesson_lock:
+            if self._lesson_db is not None:
+                self._lesson_db.close()
+                self._lesson_db = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
 
 
 
@@ -11,14 +11,27 @@ CRITICAL:
 - Returns path to WAV file for pygame playback
 """
 
+import json
 import logging
 import subprocess
+import tempfile
+import threading
 from pathlib import Path
 from typing import Optional
 import re
 
 logger = logging.getLogger(__name__)
 
+# Voice settings shared by the persistent and one-shot Piper invocations
+_VOICE_ARGS = [
+    "--length_scale", "1.4",  # Slower, calmer speech
+    "--noise_scale", "0.4",   # Clear voice
+    "--noise_w", "0.7"        # Natural variation
+]
+
+# Bracketed markers ([PAUSE], [EMPHASIS], ...) left in text sent to Piper
+_BRACKETS = re.compile(r'\[.*?\]')
+
 
 class PiperTTS:
     """
@@ -26,6 +39,11 @@ class PiperTTS:
     
     Generates WAV files without any playback.
     All audio playback is handled by the existing pygame-based system.
+    
+    A single Piper process is kept running in --json-input mode so the
+    ONNX voice model is loaded once, not once per utterance. If that
+    process can't be started (or dies), generation falls back to a
+    one-shot Piper run per call.
     """
     
     def __init__(
@@ -52,8 +70,93 @@ class PiperTTS:
             logger.error(f"Piper model not found: {self.model_path}")
             raise FileNotFoundError(f"Piper model not found: {self.model_path}")
         
+        # Persistent Piper process (one utterance at a time)
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._start_process()
+        
         logger.info(f"✓ PiperTTS initialized: {self.model_path.name}")
     
+    def _start_process(self):
+        """Launch the long-lived Piper process (ONNX model loads once here)."""
+        try:
+            self._proc = subprocess.Popen(
+                [
+                    str(self.piper_exe),
+                    "--model", str(self.model_path),
+                    "--json-input",
+                    "--output_dir", tempfile.gettempdir(),  # overridden per line by output_file
+                    *_VOICE_ARGS
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                bufsize=1
+            )
+            logger.info("✓ Persistent Piper process started")
+        except Exception as e:
+            logger.warning(f"Could not start persistent Piper process: {e}")
+            self._proc = None
+    
+    def _generate_persistent(self, clean_text: str, output_path: Path) -> bool:
+        """
+        Synthesize one utterance on the persistent process.
+        
+        Piper prints the output file path to stdout once the WAV is written,
+        which serves as the completion signal.
+        
+        Returns:
+            True if the WAV was written, False if the process is unusable
+        """
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                return False
+            
+            # Same 60s budget as a one-shot run; killing the process unblocks readline()
+            watchdog = threading.Timer(60, self._proc.kill)
+            watchdog.start()
+            try:
+                request = {"text": clean_text, "output_file": str(output_path)}
+                self._proc.stdin.write(json.dumps(request) + "\n")
+                self._proc.stdin.flush()
+                done = self._proc.stdout.readline()
+            except Exception as e:
+                logger.warning(f"Persistent Piper process failed: {e}")
+                done = ""
+            finally:
+                watchdog.cancel()
+            
+            if not done:
+                # Process died; drop it and let the caller fall back to one-shot
+                self._stop_process()
+                return False
+        
+        return output_path.exists() and output_path.stat().st_size > 0
+    
+    def _stop_process(self):
+        """Terminate the persistent Piper process (caller holds the lock)."""
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=2)
+        except Exception:
+            self._proc.kill()
+        self._proc = None
+    
+    def close(self):
+        """Shut down the persistent Piper process."""
+        with self._lock:
+            self._stop_process()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
     def generate(self, text: str, output_path: Path) -> bool:
         """
         Generate WAV audio file from text using Piper.
@@ -79,6 +182,13 @@ class PiperTTS:
             # Clean text for TTS (remove any remaining markers)
             clean_text = self._clean_text(text)
             
+            logger.debug(f"🎙️ Generating Piper audio: {output_path.name}")
+            
+            # Fast path: model already loaded in the persistent process
+            if self._generate_persistent(clean_text, output_path):
+                logger.info(f"✓ Piper generated audio successfully (offline): {output_path.name}")
+                return True
+            
             # Build Piper command
             # CRITICAL: --output_file ensures WAV is written to disk
             # No playback commands, no shell=True, no os.startfile
@@ -86,13 +196,9 @@ class PiperTTS:
                 str(self.piper_exe),
                 "--model", str(self.model_path),
                 "--output_file", str(output_path),
-                "--length_scale", "1.4",  # Slower, calmer speech
-                "--noise_scale", "0.4",   # Clear voice
-                "--noise_w", "0.7"        # Natural variation
+                *_VOICE_ARGS
             ]
             
-            logger.debug(f"🎙️ Generating Piper audio: {output_path.name}")
-            
             # Run Piper with text piped to stdin
             # subprocess.run waits for completion and exits cleanly
             result = subprocess.run(
@@ -132,11 +238,8 @@ class PiperTTS:
         Returns:
             Cleaned text
         """
-        # Remove any remaining bracketed markers
-        clean = re.sub(r'\[.*?\]', '', text)
-        
-        # Remove excessive whitespace
-        clean = re.sub(r'\s+', ' ', clean)
-        clean=clean.strip()
-        
-        return clean
+        # Remove any remaining bracketed markers (skipping the regex when
+        # there are none), then collapse whitespace and trim in one pass
+        if '[' in text:
+            text = _BRACKETS.sub('', text)
+        return ' '.join(text.split())
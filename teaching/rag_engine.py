@@ -21,16 +21,72 @@ TEACHING MODES:
    - Fallback to OFFLINE mode if API fails
 """
 
+import hashlib
+import itertools
+import json
 import logging
 import os
+import re
 import requests
+import sqlite3
 import time
 import threading
 from pathlib import Path
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, Callable
+
+import numpy as np
+from requests.adapters import HTTPAdapter
+
+# Faster JSON for Ollama payloads and NDJSON response lines (optional)
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    _json_loads = json.loads
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Concurrent Ollama generations allowed from this process.
+# Defaults to one at a time: every parallel slot costs its own KV cache, which
+# a memory-constrained machine can't afford. To opt in, start the server with
+# the same value (`OLLAMA_NUM_PARALLEL=4 ollama serve`) so concurrent requests
+# are batched instead of queueing inside Ollama against the read timeout. If
+# lecture and Q&A use different models, also raise OLLAMA_MAX_LOADED_MODELS on
+# the server so neither model is evicted mid-session.
+try:
+    OLLAMA_NUM_PARALLEL = max(1, int(os.getenv("OLLAMA_NUM_PARALLEL", "1")))
+except ValueError:
+    logging.getLogger(__name__).warning(
+        f"Ignoring non-integer OLLAMA_NUM_PARALLEL={os.getenv('OLLAMA_NUM_PARALLEL')!r}; using 1"
+    )
+    OLLAMA_NUM_PARALLEL = 1
+_ollama_slots = threading.BoundedSemaphore(OLLAMA_NUM_PARALLEL)
+
+# How long Ollama keeps the model loaded after a request, so retries and
+# the next lecture don't pay the model load again
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Shared HTTP session: keep-alive connections to the local Ollama server are
+# reused across generations instead of opening a new socket per call. The
+# pool covers every lecture slot plus concurrent Q&A streams.
+_session = requests.Session()
+_session.mount(
+    'http://',
+    HTTPAdapter(pool_connections=8, pool_maxsize=max(8, OLLAMA_NUM_PARALLEL + 2))
+)
+
+# Sentence boundary for handing streamed lecture text to TTS
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# First two period-delimited sentences of a chunk (offline lecture intro/summary)
+_LEADING_SENTENCES = re.compile(r'[^.]*(?:\.[^.]*)?')
 
-# Global lock for Ollama API calls (ensures only one generation at a time)
-_ollama_lock = threading.Lock()
+# Cosine similarity at which a new topic reuses a cached lecture for a
+# previously taught topic ("photosynthesis" vs "photosynthesis in plants")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
 
 # Configure logging
 logging.basicConfig(
@@ -45,7 +101,12 @@ def generate_with_ollama(
     model: str = "mistral",
     max_retries: int = 2,
     num_ctx: int = 2048,
-    num_predict: int = 300
+    num_predict: int = 300,
+    on_sentence: Optional[Callable[[str], None]] = None,
+    retry_prompt: Optional[Callable[[int], str]] = None,
+    num_thread: Optional[int] = None,
+    temperature: Optional[float] = None,
+    top_p: Optional[float] = None
 ) -> str:
     """
     Generate text using Ollama's local LLM API with retry mechanism.
@@ -53,7 +114,19 @@ def generate_with_ollama(
     This function sends a prompt to the Ollama service running locally
     and returns the generated response. Includes retry logic for timeouts.
     
-    THREAD-SAFE: Uses global lock to ensure only one Ollama call at a time.
+    The response is streamed: tokens are collected as Ollama produces them,
+    and each completed sentence is passed to ``on_sentence`` (if given) so
+    the caller can start TTS while the rest is still generating. Sentences
+    are only emitted on the first attempt; callers should verify the
+    streamed sentences against the returned text.
+    
+    A timeout usually means the prompt is too long to prefill on this
+    hardware, so resending it unchanged just times out again. If
+    ``retry_prompt`` is given, it is called with the attempt number and
+    should return a shorter prompt (e.g. with fewer retrieved chunks).
+    
+    THREAD-SAFE: At most OLLAMA_NUM_PARALLEL calls are in flight at once,
+    so background lecture preparation overlaps several generations.
     
     MEMORY MANAGEMENT:
     - num_ctx caps the KV cache allocation (default Ollama = 4096).
@@ -67,6 +140,11 @@ def generate_with_ollama(
         max_retries: Maximum number of retry attempts for timeouts (default: 2)
         num_ctx: Context window size — controls KV cache memory (default: 2048)
         num_predict: Max tokens to generate (default: 300)
+        on_sentence: Optional callback receiving each completed sentence
+        retry_prompt: Optional callback building a shorter prompt for retry N
+        num_thread: CPU threads for generation (default: Ollama's choice)
+        temperature: Sampling temperature (default: model's setting)
+        top_p: Nucleus sampling cutoff (default: model's setting)
     
     Returns:
         Generated text response from Ollama
@@ -83,8 +161,16 @@ def generate_with_ollama(
     """
     ollama_url = "http://localhost:11434/api/generate"
     
-    # Acquire lock to ensure only ONE Ollama generation at a time
-    with _ollama_lock:
+    options = {"num_ctx": num_ctx, "num_predict": num_predict}
+    if num_thread is not None:
+        options["num_thread"] = num_thread
+    if temperature is not None:
+        options["temperature"] = temperature
+    if top_p is not None:
+        options["top_p"] = top_p
+    
+    # Take one of the server's parallel slots
+    with _ollama_slots:
         for attempt in range(max_retries + 1):
             try:
                 if attempt > 0:
@@ -92,30 +178,62 @@ def generate_with_ollama(
                 else:
                     logger.info(f"Generating lecture using Senku...")
                 
-                response = requests.post(
+                emit = on_sentence if attempt == 0 else None
+                
+                with _session.post(
                     ollama_url,
-                    json={
+                    data=_json_dumps({
                         "model": model,
                         "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "num_ctx": num_ctx,
-                            "num_predict": num_predict,
-                        }
-                    },
-                    timeout=180  # Increased to 180 seconds for longer generations
-                )
+                        "stream": True,
+                        "keep_alive": OLLAMA_KEEP_ALIVE,
+                        "options": options
+                    }),
+                    headers=_JSON_HEADERS,
+                    stream=True,
+                    timeout=180  # Per read: the budget for prefill / between tokens
+                ) as response:
+                    # Check if request was successful
+                    if response.status_code != 200:
+                        error_msg = f"Ollama API error: {response.status_code} - {response.text}"
+                        logger.error(error_msg)
+                        raise Exception(error_msg)
+                    
+                    parts = []
+                    buffer = ""
+                    try:
+                        for raw_line in response.iter_lines():
+                            if not raw_line:
+                                continue
+                            chunk = _json_loads(raw_line)
+                            # Ollama reports mid-stream failures as an error line
+                            if "error" in chunk:
+                                raise Exception(f"Ollama stream error: {chunk['error']}")
+                            token = chunk.get("response", "")
+                            parts.append(token)
+                            
+                            if emit is not None:
+                                buffer += token
+                                *complete, buffer = _SENTENCE_END.split(buffer)
+                                for sentence in complete:
+                                    if sentence.strip():
+                                        emit(sentence.strip())
+                            
+                            if chunk.get("done"):
+                                break
+                    except (requests.exceptions.ChunkedEncodingError,
+                            requests.exceptions.ConnectionError) as e:
+                        # requests surfaces a read stall mid-stream as a
+                        # connection error; the server is up, so retry it
+                        # like any other timeout
+                        raise requests.exceptions.ReadTimeout(str(e)) from e
+                    
+                    if emit is not None and buffer.strip():
+                        emit(buffer.strip())
                 
-                # Check if request was successful
-                if response.status_code == 200:
-                    result = response.json()
-                    generated_text = result.get("response", "")
-                    logger.info(f"✓ Generated successfully ({len(generated_text)} chars, ctx={num_ctx})")
-                    return generated_text
-                else:
-                    error_msg = f"Ollama API error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+                generated_text = "".join(parts)
+                logger.info(f"✓ Generated successfully ({len(generated_text)} chars, ctx={num_ctx})")
+                return generated_text
                     
             except requests.exceptions.ConnectionError:
                 error_msg = "Senku backend service is not running. Please start the service."
@@ -124,6 +242,9 @@ def generate_with_ollama(
             except requests.exceptions.Timeout:
                 if attempt < max_retries:
                     logger.warning(f"Senku is taking longer than expected. Retrying... ({attempt + 1}/{max_retries})")
+                    if retry_prompt is not None:
+                        prompt = retry_prompt(attempt + 1)
+                        logger.info(f"  Shortened prompt to {len(prompt)} chars")
                     continue
                 else:
                     error_msg = "Senku is taking longer to prepare the lesson. The content may be complex."
@@ -150,9 +271,10 @@ def generate_with_ollama_streaming(
     """
     Stream tokens from Ollama's local LLM API, one token at a time.
 
-    Designed EXCLUSIVELY for Q&A mode streaming. Lecture generation uses
-    generate_with_ollama() (non-streaming) instead — this function must
-    never be called from lecture generation paths.
+    Used for Q&A mode streaming, and for the first lecture of a voiced
+    teaching session so its opening sentences can be synthesized while the
+    rest is still generating. All other lecture generation (prefetch, text
+    mode) uses generate_with_ollama(), which returns the whole response.
 
     HOW IT WORKS:
     - Sends a POST with ``stream: true`` to Ollama's /api/generate endpoint.
@@ -163,9 +285,9 @@ def generate_with_ollama_streaming(
       the moment a sentence boundary is detected.
 
     THREAD SAFETY:
-    - Does NOT acquire ``_ollama_lock``. The voice-state machine guarantees
-      that only one subsystem (lecture or Q&A) uses Ollama at a time by
-      transitioning to PROCESSING state before calling this function.
+    - Does NOT take an ``_ollama_slots`` slot, so a student question is never
+      queued behind background lecture generation. Ollama's own request
+      queue absorbs the extra request if all parallel slots are busy.
 
     MEMORY MANAGEMENT:
     - num_ctx=2048 keeps KV cache half of Ollama's default 4096.
@@ -196,14 +318,13 @@ def generate_with_ollama_streaming(
         for token in generate_with_ollama_streaming("What is photosynthesis?"):
             print(token, end="", flush=True)
     """
-    import json as _json
-
     ollama_url = "http://localhost:11434/api/generate"
 
     payload = {
         "model": model,
         "prompt": prompt,
         "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "options": {
             "num_ctx": num_ctx,
             "num_predict": num_predict,
@@ -222,9 +343,10 @@ def generate_with_ollama_streaming(
     )
 
     try:
-        with requests.post(
+        with _session.post(
             ollama_url,
-            json=payload,
+            data=_json_dumps(payload),
+            headers=_JSON_HEADERS,
             stream=True,
             timeout=60,          # Per-chunk timeout; streaming keeps connection alive
         ) as resp:
@@ -238,8 +360,8 @@ def generate_with_ollama_streaming(
                     continue  # Skip keep-alive blank lines
 
                 try:
-                    chunk = _json.loads(raw_line)
-                except _json.JSONDecodeError:
+                    chunk = _json_loads(raw_line)
+                except ValueError:  # json / orjson JSONDecodeError
                     logger.warning(f"[QA-STREAM] Non-JSON line skipped: {raw_line!r}")
                     continue
 
@@ -281,7 +403,12 @@ class RAGTeachingEngine:
         llm_model: Optional[str] = None,
         top_k: int = 6,
         teaching_mode: str = "OFFLINE",
-        cache_dir: str ="./lectures"
+        cache_dir: str ="./lectures",
+        num_ctx: int = 3072,
+        num_predict: int = 1200,
+        num_thread: Optional[int] = None,
+        temperature: Optional[float] = 0.3,
+        top_p: Optional[float] = 0.9
     ):
         """
         Initialize the RAG Teaching Engine.
@@ -294,6 +421,11 @@ class RAGTeachingEngine:
             top_k: Number of chunks to retrieve
             teaching_mode: "OFFLINE" or "LLM"
             cache_dir: Directory to store cached lectures
+            num_ctx: Ollama context window (prompt + lecture fit in ~3000 tokens)
+            num_predict: Ollama output cap in tokens (~900 words)
+            num_thread: Ollama CPU threads (default: Ollama's choice)
+            temperature: Ollama sampling temperature
+            top_p: Ollama nucleus sampling cutoff
         """
         self.vector_db = vector_database
         self.embedding_gen = embedding_generator
@@ -302,9 +434,26 @@ class RAGTeachingEngine:
         self.teaching_mode = teaching_mode.upper()
         self.cache_dir = Path(cache_dir)
         
+        # Ollama generation options for lectures
+        self.ollama_options = {
+            "num_ctx": num_ctx,
+            "num_predict": num_predict,
+            "num_thread": num_thread,
+            "temperature": temperature,
+            "top_p": top_p,
+        }
         
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
+        # Lecture cache: one SQLite (WAL) store holding every cached lecture
+        # and its topic embedding for the semantic cache
+        self._lecture_lock = threading.Lock()
+        self._lecture_db = self._open_lecture_db()
+        
+        # Semantic cache index: unit-normalised topic embeddings -> topic keys
+        self._semantic_vectors = None
+        self._semantic_keys: List[str] = []
+        self._load_semantic_index()
 
         self.llm_client = None
         self.llm_model = llm_model
@@ -342,10 +491,15 @@ class RAGTeachingEngine:
                 # We'll use the generate_with_ollama function directly
                 # Just verify that Ollama is running
                 try:
-                    response = requests.get("http://localhost:11434/api/tags", timeout=5)
+                    response = _session.get("http://localhost:11434/api/tags", timeout=5)
                     if response.status_code == 200:
                         logger.info(f"Ollama service detected, using model: {self.llm_model}")
                         self.llm_client = "ollama"  # Marker that Ollama is available
+                        
+                        # Load the model now rather than on the first teach()
+                        threading.Thread(
+                            target=self._prewarm_ollama, daemon=True, name="ollama-prewarm"
+                        ).start()
                     else:
                         raise Exception("Ollama service responded with error")
                 except Exception as e:
@@ -382,34 +536,162 @@ class RAGTeachingEngine:
             logger.error(f"Failed to initialize LLM client: {e}")
             raise
 
-    def _get_cache_path(self, topic: str) -> Path:
-        """Get the cache file path for a topic."""
-        # Sanitize filename (replace spaces with underscores, keep alphanumeric)
+    def _prewarm_ollama(self):
+        """Ask Ollama to load the model so the first lecture skips the cold start."""
+        try:
+            # An empty prompt loads the weights without generating anything
+            _session.post(
+                "http://localhost:11434/api/generate",
+                data=_json_dumps({"model": self.llm_model, "prompt": "", "stream": False,
+                                  "keep_alive": OLLAMA_KEEP_ALIVE}),
+                headers=_JSON_HEADERS,
+                timeout=300
+            )
+            logger.info(f"Ollama model '{self.llm_model}' loaded")
+        except Exception as e:
+            logger.debug(f"Ollama prewarm failed: {e}")
+
+    def _open_lecture_db(self) -> sqlite3.Connection:
+        """
+        Open (or create) the lecture cache in cache_dir/lectures.db.
+        
+        Lectures cached by older versions as sanitised-name files are picked
+        up lazily by _load_from_cache().
+        """
+        conn = sqlite3.connect(
+            str(self.cache_dir / "lectures.db"), isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS lectures ("
+            "topic_hash TEXT PRIMARY KEY, topic TEXT NOT NULL, content TEXT NOT NULL, "
+            "embedding BLOB, created_at INTEGER NOT NULL)"
+        )
+        return conn
+
+    def _topic_key(self, topic: str) -> str:
+        """Get the cache key for a topic."""
+        # Short hash of the normalised topic: distinct topics never collide
+        # ("Photosynthesis!" vs "Photosynthesis?"), unlike a sanitised name
+        return hashlib.sha1(topic.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+    def _get_legacy_cache_path(self, topic: str) -> Path:
+        """Get the pre-database (sanitised topic name) cache file path."""
         safe_topic = "".join(c if c.isalnum() else "_" for c in topic).lower()
         return self.cache_dir / f"{safe_topic}.txt"
 
     def _load_from_cache(self, topic: str) -> Optional[str]:
         """Load lecture from cache if it exists."""
-        cache_path = self._get_cache_path(topic)
-        if cache_path.exists():
+        with self._lecture_lock:
+            row = self._lecture_db.execute(
+                "SELECT content FROM lectures WHERE topic_hash = ?", (self._topic_key(topic),)
+            ).fetchone()
+        if row:
             logger.info(f"Cache hit for topic: '{topic}'")
-            return cache_path.read_text(encoding="utf-8")
+            return row[0]
+        
+        # Lectures cached as sanitised-name files by older versions
+        legacy_path = self._get_legacy_cache_path(topic)
+        if legacy_path.exists():
+            logger.info(f"Cache hit for topic: '{topic}'")
+            content = legacy_path.read_text(encoding="utf-8")
+            self._save_to_cache(topic, content)
+            return content
         return None
 
-    def _save_to_cache(self, topic: str, content: str):
-        """Save lecture to cache."""
+    def _save_to_cache(self, topic: str, content: str, query_embedding: Optional[List[float]] = None):
+        """
+        Save lecture to cache.
+        
+        If the topic's embedding is given, it is stored alongside the lecture
+        and added to the semantic cache.
+        """
         try:
-            cache_path = self._get_cache_path(topic)
-            cache_path.write_text(content, encoding="utf-8")
-            logger.info(f"Saved lecture to cache: {cache_path}")
+            key = self._topic_key(topic)
+            vector = None
+            if query_embedding:
+                vector = np.asarray(query_embedding, dtype=np.float32)
+                vector = vector / max(np.linalg.norm(vector), 1e-12)
+            
+            with self._lecture_lock:
+                self._lecture_db.execute(
+                    "INSERT OR REPLACE INTO lectures VALUES (?, ?, ?, ?, ?)",
+                    (key, topic, content, vector.tobytes() if vector is not None else None,
+                     int(time.time()))
+                )
+                if vector is not None:
+                    self._add_to_semantic_index(key, vector)
+            logger.info(f"Saved lecture to cache: '{topic}'")
         except Exception as e:
             logger.error(f"Failed to save cache: {e}")
 
-    def _retrieve_context(self, topic: str) -> Tuple[str, List[Tuple[str, float, Dict]]]:
+    def _load_semantic_index(self):
+        """Load the semantic cache index from the lecture store."""
+        try:
+            with self._lecture_lock:
+                rows = self._lecture_db.execute(
+                    "SELECT topic_hash, embedding FROM lectures "
+                    "WHERE embedding IS NOT NULL ORDER BY created_at"
+                ).fetchall()
+            if not rows:
+                return
+            
+            # Keep only embeddings from the current (most recent) model
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in rows]
+            dim = vectors[-1].shape[0]
+            keep = [i for i, v in enumerate(vectors) if v.shape[0] == dim]
+            self._semantic_vectors = np.stack([vectors[i] for i in keep])
+            self._semantic_keys = [rows[i][0] for i in keep]
+        except Exception as e:
+            logger.warning(f"Could not load semantic cache index: {e}")
+            self._semantic_vectors, self._semantic_keys = None, []
+
+    def _semantic_lookup(self, query_embedding: List[float]) -> Optional[str]:
+        """Return a cached lecture whose topic is semantically close enough."""
+        if self._semantic_vectors is None or not len(self._semantic_vectors):
+            return None
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape[0] != self._semantic_vectors.shape[1]:
+            return None  # index built with a different embedding model
+        
+        scores = self._semantic_vectors @ (query / max(np.linalg.norm(query), 1e-12))
+        best = int(np.argmax(scores))
+        if scores[best] < SEMANTIC_CACHE_THRESHOLD:
+            return None
+        
+        with self._lecture_lock:
+            row = self._lecture_db.execute(
+                "SELECT topic, content FROM lectures WHERE topic_hash = ?",
+                (self._semantic_keys[best],)
+            ).fetchone()
+        if not row:
+            return None
+        
+        logger.info(f"Semantic cache hit ({scores[best]:.3f}): '{row[0]}'")
+        return row[1]
+
+    def _add_to_semantic_index(self, key: str, vector: np.ndarray):
+        """Add a unit-normalised topic embedding to the in-memory index."""
+        if self._semantic_vectors is None or self._semantic_vectors.shape[1] != vector.shape[0]:
+            # First entry, or the embedding model changed: start over
+            self._semantic_vectors = np.empty((0, vector.shape[0]), dtype=np.float32)
+            self._semantic_keys = []
+        
+        self._semantic_vectors = np.vstack([self._semantic_vectors, vector[None, :]])
+        self._semantic_keys.append(key)
+
+    def _retrieve_context(
+        self,
+        topic: str,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[str, List[Tuple[str, float, Dict]]]:
         """Retrieve relevant content from vector database."""
         logger.info(f"Retrieving context for topic: '{topic}'")
         try:
-            query_embedding = self.embedding_gen.generate_embedding(topic)
+            if query_embedding is None:
+                query_embedding = self.embedding_gen.generate_embedding_cached(topic)
             if not query_embedding:
                 raise ValueError("Failed to generate embedding")
             
@@ -439,23 +721,22 @@ class RAGTeachingEngine:
         # 1. Introduction (Use the most relevant chunk)
         intro_chunk = chunks[0] if chunks else "Topic information not available."
         # Take first 2 sentences for intro
-        intro_sentences = intro_chunk.split('.')[:2]
-        intro_text = ". ".join(intro_sentences) + "."
+        intro_text = _LEADING_SENTENCES.match(intro_chunk).group() + "."
         
         # 2. Main Explanation (Combine top 3 chunks)
         explanation_chunks = chunks[:3]
         explanation_text = "\n\n".join(explanation_chunks)
         
         # 3. Key Points (Extract roughly from chunks)
-        # Simple heuristic: Split by newlines and take distinct substantial lines
-        lines = [line.strip() for line in (chunks[0] + "\n" + chunks[1]).split('\n') if len(line.strip()) > 30]
-        key_points = lines[:5] # Take up to 5 points
+        # Simple heuristic: take up to 5 substantial lines from the top 2 chunks,
+        # stopping as soon as 5 are found
+        stripped = (line.strip() for chunk in chunks[:2] for line in chunk.splitlines())
+        key_points = list(itertools.islice((line for line in stripped if len(line) > 30), 5))
         formatted_points = "\n".join([f"• {point}" for point in key_points])
         
         # 4. Summary (Last chunk or derived)
         summary_chunk = chunks[-1] if len(chunks) > 1 else chunks[0]
-        summary_text = summary_chunk.split('.')[:2]
-        summary_text = ". ".join(summary_text) + "."
+        summary_text = _LEADING_SENTENCES.match(summary_chunk).group() + "."
         
         lecture = f"""**Introduction**
 {intro_text}
@@ -496,7 +777,7 @@ Now, generate the lecture:"""
 
         if self.llm_provider == "ollama":
             # Use Ollama for local generation
-            return generate_with_ollama(prompt, model=self.llm_model)
+            return generate_with_ollama(prompt, model=self.llm_model, **self.ollama_options)
             
         elif self.llm_provider == "gemini":
             response = self.llm_client.generate_content(prompt)
@@ -528,12 +809,19 @@ Now, generate the lecture:"""
             return cached_lecture
         
         try:
-            # 2. Retrieve Context
-            context, results = self._retrieve_context(topic)
+            # 2. Check Semantic Cache (near-identical topics taught before)
+            query_embedding = self.embedding_gen.generate_embedding_cached(topic)
+            if query_embedding:
+                cached_lecture = self._semantic_lookup(query_embedding)
+                if cached_lecture:
+                    return cached_lecture
+            
+            # 3. Retrieve Context
+            context, results = self._retrieve_context(topic, query_embedding)
             if not context:
                 return "The textbook does not contain information about this topic."
             
-            # 3. Generate Lecture (Try LLM if enabled, fallback to Offline)
+            # 4. Generate Lecture (Try LLM if enabled, fallback to Offline)
             lecture = ""
             if self.teaching_mode == "LLM":
                 try:
@@ -546,8 +834,8 @@ Now, generate the lecture:"""
                 # OFFLINE Mode
                 lecture = self._generate_offline_lecture(topic, context, results)
             
-            # 4. Save to Cache and Return
-            self._save_to_cache(topic, lecture)
+            # 5. Save to Cache and Return
+            self._save_to_cache(topic, lecture, query_embedding)
             return lecture
             
         except Exception as e:
@@ -12,17 +12,34 @@ Features:
 - Cross-platform support (Windows, Mac, Linux)
 """
 
+import binascii
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import itertools
+import json
 import logging
+import queue
 import re
-from typing import Optional, List
+import threading
+import wave
+from typing import Optional, List, Tuple, Dict
 import requests
-import base64
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 from pathlib import Path
 import tempfile
 import pygame
 from dotenv import load_dotenv
 
+# Faster parsing of Inworld's JSON responses (optional)
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 # Import Piper TTS for offline fallback
 try:
     from .piper_tts import PiperTTS
@@ -41,6 +58,291 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# How many sentences ahead of playback have their audio generated
+_SENTENCE_PREFETCH = 3
+
+# How often playback is checked for completion; bounds the gap between
+# consecutive sentences
+_PLAYBACK_POLL_MS = 15
+
+# Locks guarding sentence cache files, shared out by text hash. A fixed set
+# keeps memory flat however many distinct sentences a server sees
+_AUDIO_LOCK_STRIPES = 64
+
+# Resolved audio paths remembered per engine, so replays skip the stat() calls
+_AUDIO_PATH_CACHE_SIZE = 2048
+
+# Decoded (PCM) sentence audio kept in memory for instant replay. Bounded by
+# entry count and by total duration. Whole-lesson files are streamed through
+# mixer.music instead (see TTSEngine._play)
+_PCM_CACHE_SIZE = 16
+_PCM_CACHE_SECONDS = 600
+
+# Consecutive sentences are packed into one TTS request up to this length
+# when nothing needs per-sentence timing (see TTSEngine._batch_sentences)
+_BATCH_MAX_CHARS = 400
+
+# Lesson header and sentence/paragraph boundaries
+_LESSON_HEADER = re.compile(r'^Lesson \d+\s*\n+')
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n|\n')
+
+# Every marker/reference rule fused into one alternation, so text is scanned
+# once instead of once per rule. The named group that matched picks the
+# replacement (see _TTS_REPLACEMENTS / _DISPLAY_REPLACEMENTS).
+_REFERENCE_PREFIX = r'(?:(?:see|as\s+shown\s+in|refer\s+to)\s+)?'
+_CLEANUP = re.compile(
+    r'(?P<header>(?-i:^Lesson \d+\s*\n+))'
+    r'|(?P<pause>\[PAUSE\])'
+    r'|(?P<short_pause>\[SHORT PAUSE\])'
+    r'|(?P<bracket>\[.*?\])'  # [EMPHASIS], [END OF LECTURE] and any other markers
+    r'|(?P<figure>\s*' + _REFERENCE_PREFIX + r'\(?\s*(?:see\s+)?fig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*\)?\s*)'
+    r'|(?P<table>\s*' + _REFERENCE_PREFIX + r'\(?\s*(?:see\s+)?table\.?\s+\d+(?:\.\d+)?\s*\)?\s*)'
+    r'|(?P<image>(?:as\s+shown\s+in|refer\s+to)\s+the\s+(?:image|diagram|illustration|chart|graph))'
+    r'|(?P<see_image>see\s+the\s+(?:image|diagram|illustration|chart|graph)\s+(?:above|below))',
+    re.IGNORECASE
+)
+
+# Spoken text: pacing markers become natural pauses
+_TTS_REPLACEMENTS = {
+    'header': '',
+    'pause': '. ',
+    'short_pause': ', ',
+    'bracket': '',
+    'figure': ' ',
+    'table': ' ',
+    'image': '',
+    'see_image': '',
+}
+
+# Display text (per sentence): pacing markers are simply dropped; the lesson
+# header and "see the image above" are left alone
+_DISPLAY_REPLACEMENTS = {
+    'pause': '',
+    'short_pause': '',
+    'bracket': '',
+    'figure': ' ',
+    'table': ' ',
+    'image': '',
+}
+
+# Space left before punctuation once whitespace is collapsed
+_SPACE_BEFORE_PUNCT = re.compile(r' ([.,;:!?])')
+
+
+def _save_audio_content(response_body: bytes, path: Path) -> int:
+    """
+    Decode an Inworld response's base64 audioContent straight into a file.
+    
+    The audio is decoded in 64 KB slices rather than as one bytes copy, and
+    written under a temporary name (see _partial_path) so a half-written
+    file is never cached.
+    
+    Returns:
+        Number of audio bytes written
+    """
+    encoded = _json_loads(response_body)['audioContent']
+    chunk = 65536  # multiple of 4, so every slice is whole base64 quanta
+    
+    written = 0
+    partial = _partial_path(path)
+    try:
+        with open(partial, "wb") as f:
+            for start in range(0, len(encoded), chunk):
+                written += f.write(binascii.a2b_base64(encoded[start:start + chunk]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return written
+
+
+def _partial_path(path: Path) -> Path:
+    """
+    Temporary name to write a cache file under before os.replace()-ing it in.
+    
+    The name is unique per process, so two processes synthesizing the same
+    sentence never write into each other's file; whichever replace lands
+    last wins with a complete file either way.
+    """
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def _generate_atomically(piper_tts, clean_text: str, path: Path) -> bool:
+    """Run Piper into a temporary file and move it into place on success."""
+    partial = _partial_path(path)
+    try:
+        if piper_tts.generate(clean_text, partial) and partial.exists():
+            os.replace(partial, path)
+            return True
+        return False
+    finally:
+        partial.unlink(missing_ok=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def _text_hash(text: str) -> str:
+    """Audio cache key for a piece of text (sentences repeat across lessons)."""
+    # Non-cryptographic use: BLAKE2b is several times faster than MD5
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _tts_replacement(match) -> str:
+    return _TTS_REPLACEMENTS[match.lastgroup]
+
+
+def _display_replacement(match) -> str:
+    return _DISPLAY_REPLACEMENTS.get(match.lastgroup, match.group())
+
+
+def _tidy_whitespace(text: str) -> str:
+    """Collapse whitespace and drop spaces before punctuation."""
+    # Two passes that both run in C (split/join, then one regex that rarely
+    # matches); a character-by-character Python loop is ~3x slower on
+    # ordinary lesson text
+    return _SPACE_BEFORE_PUNCT.sub(r'\1', ' '.join(text.split()))
+
+
+
+
+
+# Piper fallback shared by every TTSEngine in this process (see _get_shared_piper)
+_shared_piper = None
+_shared_piper_loaded = False
+_shared_piper_lock = threading.Lock()
+
+
+def _get_shared_piper():
+    """
+    Piper instance shared across engines, created on first use.
+    
+    Starting Piper loads its voice model, so engines for different PDFs
+    reuse one instance (generate() is serialized internally). A failed
+    start is remembered rather than retried for every engine.
+    """
+    global _shared_piper, _shared_piper_loaded
+    with _shared_piper_lock:
+        if not _shared_piper_loaded and PiperTTS:
+            try:
+                _shared_piper = PiperTTS()
+                logger.info("✓ Piper TTS fallback initialized")
+            except Exception as e:
+                logger.warning(f"Piper TTS not available: {e}")
+        _shared_piper_loaded = True
+        return _shared_piper
+
+
+# Per-process Piper instance for lesson pre-rendering (see TTSEngine.prerender_lesson_audio)
+_worker_piper = None
+
+
+def _init_render_worker(piper_exe: str, model_path: str):
+    """ProcessPoolExecutor initializer: one persistent Piper per worker process."""
+    global _worker_piper
+    _worker_piper = PiperTTS(piper_exe=piper_exe, model_path=model_path)
+
+
+def render_lesson_wav(clean_text: str, output_path: str) -> Optional[str]:
+    """
+    Render one lesson's (already cleaned) text to a WAV in a worker process.
+    
+    Returns:
+        output_path on success, None otherwise
+    """
+    # Write under a temporary name so a half-written WAV is never picked up
+    # as a cache hit by generate_lesson_audio()
+    if _worker_piper and _generate_atomically(_worker_piper, clean_text, Path(output_path)):
+        return output_path
+    return None
+
+
+class LessonAudioStream:
+    """
+    Render a lesson's audio sentence by sentence while the lecture streams in.
+    
+    Sentences pushed from the LLM stream are synthesized by a Piper worker
+    thread into numbered part WAVs. finish() stitches them into the lesson's
+    cached audio.wav, but only if the streamed sentences add up to the final
+    lecture text and every one of them was rendered (a retried or cached
+    generation, or one with a failed sentence, is discarded instead).
+    """
+    
+    def __init__(self, piper_tts, clean_text, lesson_dir: Path):
+        self._piper = piper_tts
+        self._clean_text = clean_text
+        self._lesson_dir = lesson_dir
+        self._sentences: List[str] = []
+        self._parts: List[Path] = []
+        self._failed = False
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(target=self._render, daemon=True)
+        self._worker.start()
+    
+    def push(self, sentence: str):
+        """Queue one raw lecture sentence for synthesis."""
+        self._sentences.append(sentence)
+        self._queue.put(sentence)
+    
+    def _render(self):
+        while True:
+            sentence = self._queue.get()
+            if sentence is None:
+                return
+            clean = self._clean_text(sentence)
+            if not clean:
+                continue
+            part = self._lesson_dir / f"part_{len(self._parts):03d}.wav"
+            try:
+                if self._piper.generate(clean, part):
+                    self._parts.append(part)
+                    continue
+            except Exception as e:
+                logger.debug(f"Streamed sentence synthesis failed: {e}")
+            # A gap would be cached as the lesson audio for good
+            self._failed = True
+            part.unlink(missing_ok=True)
+    
+    def finish(self, lesson_text: str) -> Optional[Path]:
+        """
+        Wait for pending sentences and assemble the lesson WAV.
+        
+        Args:
+            lesson_text: Final lecture text (with "Lesson N" header)
+        
+        Returns:
+            Path to the lesson audio.wav, or None if the stream was discarded
+        """
+        self._queue.put(None)
+        self._worker.join()
+        
+        body = _LESSON_HEADER.sub('', lesson_text)
+        complete = ' '.join(' '.join(self._sentences).split()) == ' '.join(body.split())
+        
+        output = self._lesson_dir / "audio.wav"
+        partial = _partial_path(output)
+        try:
+            if complete and self._parts and not self._failed:
+                with wave.open(str(self._parts[0]), 'rb') as first:
+                    params = first.getparams()
+                with wave.open(str(partial), 'wb') as out:
+                    out.setparams(params)
+                    for part in self._parts:
+                        with wave.open(str(part), 'rb') as src:
+                            out.writeframes(src.readframes(src.getnframes()))
+                os.replace(partial, output)
+                logger.info(f"✓ Lesson audio assembled from {len(self._parts)} streamed sentences")
+                return output
+        except Exception as e:
+            logger.warning(f"Could not assemble streamed lesson audio: {e}")
+        finally:
+            partial.unlink(missing_ok=True)
+            for part in self._parts:
+                part.unlink(missing_ok=True)
+        
+        return None
+
+
 class TTSEngine:
     """
     Text-to-Speech Engine for AI Teacher.
@@ -77,6 +379,30 @@ class TTSEngine:
         self.voice_id = "Ronald"
         self.model_id = "inworld-tts-1"
         
+        # Shared HTTP session: keeps the TLS connection to Inworld alive across
+        # sentences, retries transient failures, and carries the auth headers.
+        # Connection failures (DNS, refused, connect timeout) and 429/5xx are
+        # retried with exponential backoff before falling back to Piper; a
+        # read timeout is not, since it has already cost 30 seconds
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=3,
+                connect=3,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset({"POST"})
+            )
+        ))
+        if self.api_key:
+            self._http.headers.update({
+                "Authorization": f"Basic {self.api_key}",
+                "Content-Type": "application/json"
+            })
+        
         # Permanent audio cache directory (to save Inworld API calls)
         # Organize by PDF hash to match lecture caching structure
         self.pdf_hash = pdf_hash
@@ -95,24 +421,79 @@ class TTSEngine:
         # Initialize pygame mixer for audio playback
         self._initialize_audio()
         
-        # Initialize Piper TTS for offline fallback
-        self.piper_tts = None
-        if PiperTTS:
-            try:
-                self.piper_tts = PiperTTS()
-                logger.info("✓ Piper TTS fallback initialized")
-            except Exception as e:
-                logger.warning(f"Piper TTS not available: {e}")
+        # Process pool for rendering upcoming lessons with Piper (created on demand)
+        self._render_pool = None
+        
+        # Upcoming lessons' audio being prepared in the background, by lesson
+        # number (see prefetch_lessons); Inworld requests run on this pool
+        self._lesson_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='lesson-audio'
+        )
+        self._lesson_futures: Dict[int, concurrent.futures.Future] = {}
+        
+        # Threads generating upcoming sentences' audio while one plays
+        self._tts_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_SENTENCE_PREFETCH, thread_name_prefix='tts-prefetch'
+        )
+        
+        # Per-text locks so two workers never write the same cache file
+        # (striped: texts whose hashes collide modulo the count share one)
+        self._audio_locks = tuple(threading.Lock() for _ in range(_AUDIO_LOCK_STRIPES))
+        self._audio_locks_guard = threading.Lock()
+        
+        # LRU of text hash -> cached audio file (see _generate_audio)
+        self._audio_paths = collections.OrderedDict()
+        
+        # LRU of audio path -> decoded pygame Sound (see _play)
+        self._pcm_lru = collections.OrderedDict()
+        self._pcm_seconds = 0.0
+        
+        # Piper TTS for offline fallback (one instance for all engines)
+        self.piper_tts = _get_shared_piper()
+        
+        # Holders of this engine through create_tts_engine() (see cleanup)
+        self._users = 0
+        
+        # Replace sentences recorded by the Piper fallback with Inworld audio
+        # in the background, now that Inworld may be reachable again
+        self._upgrade_stop = threading.Event()
+        if self.api_key:
+            threading.Thread(
+                target=self.upgrade_fallback_cache, name='tts-cache-upgrade', daemon=True
+            ).start()
+        
+        # Pay the first request's connection / first-inference cost now
+        threading.Thread(target=self._warmup, name='tts-warmup', daemon=True).start()
         
         logger.info(
             f"TTSEngine initialized: rate={rate}, volume={volume}, "
             f"voice={voice_gender}, voice_id={self.voice_id}"
         )
     
+    def _warmup(self):
+        """
+        Take the primary voice's cold-start cost off the first sentence.
+        
+        With Inworld, this resolves DNS and completes the TLS handshake, leaving
+        a live connection in the session's pool. Without it, Piper runs its
+        first (slowest) inference on a throwaway utterance.
+        """
+        try:
+            if self.api_key:
+                self._http.head(self.api_url, timeout=3)
+            elif self.piper_tts:
+                with tempfile.TemporaryDirectory() as tmp:
+                    self.piper_tts.generate("Hello.", Path(tmp) / "warmup.wav")
+            logger.debug("✓ TTS warm-up complete")
+        except Exception as e:
+            logger.debug(f"TTS warm-up skipped: {e}")
+    
     def _initialize_audio(self):
         """Initialize pygame mixer for audio playback."""
         try:
-            pygame.mixer.init()
+            # The mixer is shared with any other engine still alive
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
             pygame.mixer.music.set_volume(self.volume)
             logger.info("✓ Audio playback engine initialized successfully")
             
@@ -120,6 +501,46 @@ class TTSEngine:
             logger.error(f"Failed to initialize audio engine: {e}")
             raise
     
+    def _play(self, audio_file: Path, cache: bool = True):
+        """
+        Play an audio file and block until it finishes.
+        
+        Sentence-sized files are decoded to PCM once and the decoded Sound is
+        kept in a small LRU, so replaying a sentence starts immediately
+        instead of decoding the MP3 again. With cache=False (whole lessons,
+        rarely replayed and tens of MB decoded) the file is streamed through
+        mixer.music, so playback starts without decoding it all first.
+        """
+        key = str(audio_file)
+        if not cache:
+            pygame.mixer.music.load(key)
+            pygame.mixer.music.play()
+            
+            # Block until the current audio finishes playing
+            while pygame.mixer.music.get_busy():
+                pygame.time.wait(_PLAYBACK_POLL_MS)
+            return
+        
+        sound = self._pcm_lru.get(key)
+        if sound is None:
+            sound = pygame.mixer.Sound(key)
+            self._pcm_lru[key] = sound
+            self._pcm_seconds += sound.get_length()
+            while len(self._pcm_lru) > 1 and (
+                len(self._pcm_lru) > _PCM_CACHE_SIZE or self._pcm_seconds > _PCM_CACHE_SECONDS
+            ):
+                _, evicted = self._pcm_lru.popitem(last=False)
+                self._pcm_seconds -= evicted.get_length()
+        else:
+            self._pcm_lru.move_to_end(key)
+        
+        sound.set_volume(self.volume)
+        channel = sound.play()
+        
+        # Block until the current audio finishes playing
+        while channel is not None and channel.get_busy():
+            pygame.time.wait(_PLAYBACK_POLL_MS)
+    
     def _generate_audio(self, text: str) -> Optional[Path]:
         """
         Generate audio from text using Inworld API with Piper fallback.
@@ -145,9 +566,46 @@ class TTSEngine:
             logger.warning("Empty text provided for audio generation")
             return None
         
+        return self._generate_audio_prechecked(text)
+    
+    def _audio_lock(self, text_hash: str) -> threading.Lock:
+        """The lock guarding a text's cache files."""
+        return self._audio_locks[int(text_hash[:8], 16) % _AUDIO_LOCK_STRIPES]
+    
+    def _generate_audio_prechecked(self, text: str, clean_text: Optional[str] = None) -> Optional[Path]:
+        """
+        _generate_audio() for text already known to be non-empty.
+        
+        Args:
+            text: Text to convert to speech (the cache key is its hash)
+            clean_text: The text's _clean_text_for_tts() form, if the caller
+                already has it; otherwise it is computed on a cache miss
+        
+        Returns:
+            Path to audio file (cached or newly generated), or None if failed
+        """
         # Generate a hash for this text to use as filename
-        import hashlib
-        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+        text_hash = _text_hash(text)
+        
+        with self._audio_locks_guard:
+            audio_file = self._audio_paths.get(text_hash)
+            if audio_file is not None:
+                self._audio_paths.move_to_end(text_hash)
+                return audio_file
+        
+        # Record the path while still holding the text's lock, so the cache
+        # upgrade can't delete the file between here and the LRU insert
+        with self._audio_lock(text_hash):
+            audio_file = self._generate_audio_file(text, text_hash, clean_text)
+            if audio_file is not None:
+                with self._audio_locks_guard:
+                    self._audio_paths[text_hash] = audio_file
+                    if len(self._audio_paths) > _AUDIO_PATH_CACHE_SIZE:
+                        self._audio_paths.popitem(last=False)
+        return audio_file
+    
+    def _generate_audio_file(self, text: str, text_hash: str, clean_text: Optional[str] = None) -> Optional[Path]:
+        """Cache lookup and generation for _generate_audio() (caller holds the text's lock)."""
         audio_file_mp3 = self.cache_dir / f"tts_{text_hash}.mp3"
         audio_file_wav = self.cache_dir / f"tts_{text_hash}.wav"
         
@@ -160,36 +618,33 @@ class TTSEngine:
             logger.debug(f"✓ Using cached audio: {audio_file_wav.name} (Piper)")
             return audio_file_wav
         
-        # Clean text for TTS
-        clean_text = self._clean_text_for_tts(text)
+        # Audio cached by older versions under the MD5 key: move it to the
+        # current name so it is found directly next time
+        legacy_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+        for legacy, current in (
+            (self.cache_dir / f"tts_{legacy_hash}.mp3", audio_file_mp3),
+            (self.cache_dir / f"tts_{legacy_hash}.wav", audio_file_wav),
+        ):
+            try:
+                os.replace(legacy, current)
+                logger.debug(f"✓ Using cached audio: {current.name} (migrated)")
+                return current
+            except FileNotFoundError:
+                pass
+        
+        # Clean text for TTS (unless the caller already did)
+        if clean_text is None:
+            clean_text = self._clean_text_for_tts(text)
         
         # Try Inworld API first
         if self.api_key:
             try:
-                headers = {
-                    "Authorization": f"Basic {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "text": clean_text,
-                    "voiceId": self.voice_id,
-                    "modelId": self.model_id
-                }
-                
                 logger.debug(f"🌐 Fetching audio from Inworld API: {text[:50]}...")
                 
-                response = requests.post(self.api_url, json=payload, headers=headers, timeout=30)
-                response.raise_for_status()
-                
-                result = response.json()
-                audio_content = base64.b64decode(result['audioContent'])
-                
                 # Save to permanent cache
-                with open(audio_file_mp3, "wb") as f:
-                    f.write(audio_content)
+                size = self._fetch_inworld_audio(clean_text, audio_file_mp3)
                 
-                logger.info(f"✓ Audio cached: {audio_file_mp3.name} ({len(audio_content)} bytes)")
+                logger.info(f"✓ Audio cached: {audio_file_mp3.name} ({size} bytes)")
                 return audio_file_mp3
                 
             except (requests.exceptions.RequestException, Exception) as e:
@@ -199,10 +654,17 @@ class TTSEngine:
         # Piper fallback - generate WAV file for sentence
         if self.piper_tts:
             try:
-                success = self.piper_tts.generate(clean_text, audio_file_wav)
+                success = _generate_atomically(self.piper_tts, clean_text, audio_file_wav)
                 
-                if success and audio_file_wav.exists():
+                if success:
                     logger.debug(f"✓ Piper generated sentence audio (offline): {audio_file_wav.name}")
+                    
+                    # Keep the text next to the recording, so
+                    # upgrade_fallback_cache() can re-synthesize it later
+                    try:
+                        audio_file_wav.with_suffix(".txt").write_text(clean_text, encoding="utf-8")
+                    except OSError as e:
+                        logger.debug(f"Could not record fallback text: {e}")
                     return audio_file_wav
                 else:
                     logger.warning(f"Piper failed to generate sentence audio")
@@ -215,6 +677,130 @@ class TTSEngine:
             logger.warning("No TTS engine available for sentence audio")
             return None
     
+    def _fetch_inworld_audio(self, clean_text: str, audio_file_mp3: Path) -> int:
+        """
+        Synthesize cleaned text with Inworld into audio_file_mp3.
+        
+        Returns:
+            Number of audio bytes written (raises on any failure)
+        """
+        payload = {
+            "text": clean_text,
+            "voiceId": self.voice_id,
+            "modelId": self.model_id
+        }
+        response = self._http.post(self.api_url, json=payload, timeout=30)
+        response.raise_for_status()
+        return _save_audio_content(response.content, audio_file_mp3)
+    
+    def upgrade_fallback_cache(self, rate_limit_hz: float = 0.5) -> int:
+        """
+        Re-synthesize sentences cached from the Piper fallback with Inworld.
+        
+        A Piper WAV is served from the cache forever once written, even after
+        Inworld is reachable again. This finds tts_<hash>.wav files without an
+        .mp3 sibling (and with the text recorded next to them), fetches
+        Inworld audio for each, and deletes the WAV. Requests are spaced out
+        by rate_limit_hz, and the pass stops at the first failure, since
+        Inworld is then most likely still unavailable.
+        
+        Args:
+            rate_limit_hz: Maximum Inworld requests per second
+        
+        Returns:
+            Number of sentences upgraded
+        """
+        if not self.api_key:
+            return 0
+        
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                names = {entry.name for entry in entries}
+        except OSError as e:
+            logger.debug(f"Could not scan audio cache for upgrades: {e}")
+            return 0
+        
+        pending = [
+            name[len("tts_"):-len(".wav")]
+            for name in names
+            if name.startswith("tts_") and name.endswith(".wav")
+            and f"{name[:-4]}.mp3" not in names and f"{name[:-4]}.txt" in names
+        ]
+        
+        upgraded = 0
+        for text_hash in pending:
+            if self._upgrade_stop.wait(1.0 / rate_limit_hz):
+                break
+            
+            audio_file_mp3 = self.cache_dir / f"tts_{text_hash}.mp3"
+            audio_file_wav = audio_file_mp3.with_suffix(".wav")
+            text_file = audio_file_mp3.with_suffix(".txt")
+            
+            with self._audio_lock(text_hash):
+                if audio_file_mp3.exists() or not audio_file_wav.exists():
+                    continue
+                try:
+                    self._fetch_inworld_audio(text_file.read_text(encoding="utf-8"), audio_file_mp3)
+                except Exception as e:
+                    logger.debug(f"Stopping audio cache upgrade (Inworld unavailable): {e}")
+                    break
+                
+                with self._audio_locks_guard:
+                    self._audio_paths.pop(text_hash, None)
+                audio_file_wav.unlink(missing_ok=True)
+                text_file.unlink(missing_ok=True)
+            upgraded += 1
+        
+        if upgraded:
+            logger.info(f"✓ Upgraded {upgraded} offline sentence recordings to Inworld audio")
+        return upgraded
+    
+    def _prefetch_audio(self, sentences: List[str], cleaned: Optional[List[str]] = None):
+        """
+        Generate sentences' audio in order, keeping a few ahead of the consumer.
+        
+        The first _SENTENCE_PREFETCH sentences are submitted immediately, so
+        their API calls overlap whatever the caller does next (e.g. the lesson
+        intro); each sentence taken starts the next one.
+        
+        Sentences repeated within the lesson ("In other words.") are only
+        submitted once; later occurrences reuse the first one's result.
+        
+        Args:
+            sentences: Sentences to generate audio for
+            cleaned: Optional _clean_text_for_tts() form of each sentence
+                (non-empty), so it is not recomputed on a cache miss
+        
+        Returns:
+            Iterator of audio paths (or None), one per sentence
+        """
+        if cleaned is None:
+            generate = self._generate_audio
+            pending = zip(sentences)
+        else:
+            generate = self._generate_audio_prechecked
+            pending = zip(sentences, cleaned)
+        by_text = {}
+        futures = collections.deque()
+        
+        def submit(args):
+            future = by_text.get(args[0])
+            if future is None:
+                future = by_text[args[0]] = self._tts_pool.submit(generate, *args)
+            futures.append(future)
+        
+        for args in itertools.islice(pending, _SENTENCE_PREFETCH):
+            submit(args)
+        
+        def results():
+            while futures:
+                audio_file = futures.popleft().result()
+                for args in itertools.islice(pending, 1):
+                    submit(args)
+                yield audio_file
+        
+        return results()
+    
     def speak_text(self, text: str, sentence_by_sentence: bool = True):
         """
         Speak the given text aloud.
@@ -229,26 +815,23 @@ class TTSEngine:
         
         try:
             if sentence_by_sentence:
-                # Split into sentences and speak each one
+                # Split into sentences; nothing is highlighted here, so short
+                # neighbours share one TTS request
                 sentences = self._split_into_sentences(text)
+                batches = self._batch_sentences(sentences)
                 
-                logger.info(f"🔊 Speaking {len(sentences)} sentences...")
+                logger.info(f"🔊 Speaking {len(sentences)} sentences ({len(batches)} requests)...")
                 
-                for i, sentence in enumerate(sentences, 1):
-                    if sentence.strip():
-                        logger.debug(f"  Speaking sentence {i}/{len(sentences)}")
-                        
-                        # Generate audio for this sentence
-                        audio_file = self._generate_audio(sentence)
+                # Audio for the next batches is generated while this one plays
+                audio_files = self._prefetch_audio(batches)
+                
+                for i, (batch, audio_file) in enumerate(zip(batches, audio_files), 1):
+                    if batch.strip():
+                        logger.debug(f"  Speaking batch {i}/{len(batches)}")
                         
                         if audio_file:
                             # Play the audio
-                            pygame.mixer.music.load(str(audio_file))
-                            pygame.mixer.music.play()
-                            
-                            # Wait for playback to finish
-                            while pygame.mixer.music.get_busy():
-                                pygame.time.Clock().tick(10)
+                            self._play(audio_file)
                             
                             # Small pause between sentences
                             pygame.time.wait(200)
@@ -259,12 +842,7 @@ class TTSEngine:
                 audio_file = self._generate_audio(text)
                 
                 if audio_file:
-                    pygame.mixer.music.load(str(audio_file))
-                    pygame.mixer.music.play()
-                    
-                    # Wait for playback to finish
-                    while pygame.mixer.music.get_busy():
-                        pygame.time.Clock().tick(10)
+                    self._play(audio_file, cache=False)
             
             logger.info("✓ Speech completed")
             
@@ -282,16 +860,40 @@ class TTSEngine:
             List of sentences
         """
         # Remove "Lesson N" header if present
-        text = re.sub(r'^Lesson \d+\s*\n+', '', text)
+        text = _LESSON_HEADER.sub('', text).strip()
+        if not text:
+            return []
+        
+        # Split on sentence boundaries (., !, ?), keeping the punctuation with
+        # the sentence. The split consumes each whole whitespace run and the
+        # ends are already trimmed, so every piece is non-empty and stripped.
+        return _SENTENCE_SPLIT.split(text)
+    
+    def _batch_sentences(self, sentences: List[str], max_chars: int = _BATCH_MAX_CHARS) -> List[str]:
+        """
+        Greedily pack consecutive sentences into chunks of at most max_chars.
         
-        # Split on sentence boundaries (., !, ?)
-        # Keep the punctuation with the sentence
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        A sentence longer than max_chars gets a chunk of its own.
         
-        # Filter out empty sentences
-        sentences = [s.strip() for s in sentences if s.strip()]
+        Args:
+            sentences: Sentences in speaking order
+            max_chars: Maximum chunk length
         
-        return sentences
+        Returns:
+            List of chunks (sentences joined by spaces)
+        """
+        batches = []
+        current = []
+        length = 0
+        for sentence in sentences:
+            if current and length + 1 + len(sentence) > max_chars:
+                batches.append(' '.join(current))
+                current, length = [], 0
+            length += len(sentence) + (1 if current else 0)
+            current.append(sentence)
+        if current:
+            batches.append(' '.join(current))
+        return batches
     
     def _split_into_paragraphs_and_sentences(self, text: str) -> List[tuple]:
         """
@@ -307,10 +909,10 @@ class TTSEngine:
             List of (sentence, is_paragraph_end) tuples
         """
         # Remove "Lesson N" header if present
-        text = re.sub(r'^Lesson \d+\s*\n+', '', text)
+        text = _LESSON_HEADER.sub('', text)
         
         # Split into paragraphs (double newline or single newline)
-        paragraphs = re.split(r'\n\s*\n|\n', text)
+        paragraphs = _PARAGRAPH_SPLIT.split(text)
         
         result = []
         for para_idx, paragraph in enumerate(paragraphs):
@@ -318,7 +920,7 @@ class TTSEngine:
                 continue
             
             # Split paragraph into sentences
-            sentences = re.split(r'(?<=[.!?])\s+', paragraph)
+            sentences = _SENTENCE_SPLIT.split(paragraph)
             
             for sent_idx, sentence in enumerate(sentences):
                 if sentence.strip():
@@ -373,28 +975,19 @@ class TTSEngine:
             try:
                 logger.info(f"🌐 Generating audio for Lesson {lesson_number} from Inworld API...")
                 
-                headers = {
-                    "Authorization": f"Basic {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
                 payload = {
                     "text": clean_text,
                     "voiceId": self.voice_id,
                     "modelId": self.model_id
                 }
                 
-                response = requests.post(self.api_url, json=payload, headers=headers, timeout=30)
+                response = self._http.post(self.api_url, json=payload, timeout=30)
                 response.raise_for_status()
                 
-                result = response.json()
-                audio_content = base64.b64decode(result['audioContent'])
-                
                 # Save to lesson-specific cache
-                with open(audio_file_mp3, "wb") as f:
-                    f.write(audio_content)
+                size = _save_audio_content(response.content, audio_file_mp3)
                 
-                logger.info(f"✓ Lesson audio cached: lesson_{lesson_number}/audio.mp3 ({len(audio_content)} bytes)")
+                logger.info(f"✓ Lesson audio cached: lesson_{lesson_number}/audio.mp3 ({size} bytes)")
                 return audio_file_mp3
                 
             except (requests.exceptions.RequestException, Exception) as e:
@@ -408,9 +1001,9 @@ class TTSEngine:
         # Piper fallback - generate WAV file
         if self.piper_tts:
             try:
-                success = self.piper_tts.generate(clean_text, audio_file_wav)
+                success = _generate_atomically(self.piper_tts, clean_text, audio_file_wav)
                 
-                if success and audio_file_wav.exists():
+                if success:
                     logger.info(f"✓ Piper generated audio successfully (offline): lesson_{lesson_number}/audio.wav")
                     return audio_file_wav
                 else:
@@ -424,6 +1017,100 @@ class TTSEngine:
             logger.error("No TTS engine available (Inworld failed, Piper not initialized)")
             return None
     
+    def start_lesson_audio_stream(self, lesson_number: int) -> Optional[LessonAudioStream]:
+        """
+        Start rendering a lesson's audio from a streamed lecture.
+        
+        Offline (Piper) mode only, and only if the lesson has no cached audio;
+        see prerender_lesson_audio() for why Inworld mode is left alone.
+        
+        Args:
+            lesson_number: Lesson number (1-indexed)
+        
+        Returns:
+            LessonAudioStream to push sentences into, or None
+        """
+        if self.api_key or not self.piper_tts:
+            return None
+        
+        lesson_dir = self.cache_dir / f"lesson_{lesson_number}"
+        if (lesson_dir / "audio.mp3").exists() or (lesson_dir / "audio.wav").exists():
+            return None
+        lesson_dir.mkdir(parents=True, exist_ok=True)
+        
+        return LessonAudioStream(self.piper_tts, self._clean_text_for_tts, lesson_dir)
+    
+    def prerender_lesson_audio(self, lesson_text: str, lesson_number: int) -> Optional[concurrent.futures.Future]:
+        """
+        Render a lesson's Piper audio ahead of time in a worker process.
+        
+        Piper is CPU-bound ONNX inference, so upcoming lessons are rendered
+        on a process pool (half the cores, one persistent Piper per worker)
+        while the current lesson plays. The WAV lands at the same cache
+        path generate_lesson_audio() checks, so speaking it later is a
+        cache hit.
+        
+        Only used in offline mode (no INWORLD_API_KEY): with Inworld
+        available, a pre-rendered Piper WAV would shadow the Inworld audio.
+        
+        Args:
+            lesson_text: Complete lesson text
+            lesson_number: Lesson number (1-indexed)
+        
+        Returns:
+            Future resolving to the WAV path (or None), or None if nothing
+            needs rendering
+        """
+        if self.api_key or not self.piper_tts:
+            return None
+        
+        lesson_dir = self.cache_dir / f"lesson_{lesson_number}"
+        if (lesson_dir / "audio.mp3").exists() or (lesson_dir / "audio.wav").exists():
+            return None
+        lesson_dir.mkdir(parents=True, exist_ok=True)
+        
+        if self._render_pool is None:
+            self._render_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max(1, (os.cpu_count() or 2) // 2),
+                initializer=_init_render_worker,
+                initargs=(str(self.piper_tts.piper_exe), str(self.piper_tts.model_path))
+            )
+        
+        logger.info(f"🎙️ Pre-rendering audio for Lesson {lesson_number} in background...")
+        return self._render_pool.submit(
+            render_lesson_wav,
+            self._clean_text_for_tts(lesson_text),
+            str(lesson_dir / "audio.wav")
+        )
+    
+    def prefetch_lessons(self, items: List[Tuple[int, str]]):
+        """
+        Start preparing lessons' audio in the background.
+        
+        Offline lessons are rendered by Piper on the process pool (see
+        prerender_lesson_audio()); with Inworld, generate_lesson_audio() runs
+        on a thread pool. speak_lesson() waits for a lesson's pending job
+        instead of starting a second one, so playback starts from cache.
+        
+        Args:
+            items: (lesson_number, lesson_text) pairs
+        """
+        for lesson_number, lesson_text in items:
+            if lesson_number in self._lesson_futures:
+                continue
+            
+            future = self.prerender_lesson_audio(lesson_text, lesson_number)
+            if future is None and self.api_key:
+                lesson_dir = self.cache_dir / f"lesson_{lesson_number}"
+                if not (lesson_dir / "audio.mp3").exists():
+                    logger.info(f"🌐 Prefetching audio for Lesson {lesson_number} in background...")
+                    future = self._lesson_pool.submit(
+                        self.generate_lesson_audio, lesson_text, lesson_number
+                    )
+            
+            if future is not None:
+                self._lesson_futures[lesson_number] = future
+    
     def _clean_text_for_tts(self, text: str) -> str:
         """
         Clean text for TTS API by removing pacing markers and visual references.
@@ -440,36 +1127,9 @@ class TTSEngine:
         Returns:
             Clean text suitable for TTS
         """
-        # Remove pacing markers (convert to natural pauses)
-        clean = re.sub(r'\[PAUSE\]', '. ', text, flags=re.IGNORECASE)
-        clean = re.sub(r'\[SHORT PAUSE\]', ', ', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\[EMPHASIS\]', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\[END OF LECTURE\]', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\[.*?\]', '', clean)  # Remove any remaining bracketed content
-        
-        # Remove figure references (not relevant for audio)
-        clean = re.sub(r'\s*(?:see\s+)?\(?\s*[Ff]ig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*\)?\s*', ' ', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\s*(?:as\s+shown\s+in\s+)?[Ff]ig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*', ' ', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'\s*(?:refer\s+to\s+)?[Ff]ig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*', ' ', clean, flags=re.IGNORECASE)
-        
-        # Remove table references
-        clean = re.sub(r'\s*\(?\s*(?:see\s+)?[Tt]able\.?\s+\d+(?:\.\d+)?\s*\)?\s*', ' ', clean)
-        clean = re.sub(r'\s*(?:as\s+shown\s+in\s+)?[Tt]able\.?\s+\d+(?:\.\d+)?\s*', ' ', clean)
-        
-        # Remove generic image/diagram references
-        clean = re.sub(r'(?:as\s+shown\s+in\s+the\s+)(?:image|diagram|illustration|chart|graph)', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'(?:refer\s+to\s+the\s+)(?:image|diagram|illustration|chart|graph)', '', clean, flags=re.IGNORECASE)
-        clean = re.sub(r'(?:see\s+the\s+)(?:image|diagram|illustration|chart|graph)\s+(?:above|below)', '', clean, flags=re.IGNORECASE)
-        
-        # Remove "Lesson N" header
-        clean = re.sub(r'^Lesson \d+\s*\n+', '', clean)
-        
-        # Clean up extra whitespace and punctuation issues
-        clean = re.sub(r'\s+', ' ', clean)
-        clean = re.sub(r'\s+([.,;:!?])', r'\1', clean)
-        clean = re.sub(r'\s+\.', '.', clean)
-        clean = re.sub(r'\s+,', ',', clean)
-        clean = re.sub(r'\n\s+\n', '\n\n', clean)
+        # Pacing markers become natural pauses; references, metadata and the
+        # header are dropped in one pass; whitespace is tidied last
+        clean = _tidy_whitespace(_CLEANUP.sub(_tts_replacement, text))
         
         return clean.strip()
     
@@ -487,6 +1147,15 @@ class TTSEngine:
         logger.info(f"🎓 Speaking Lesson {lesson_number}")
         
         try:
+            # Let a background prefetch of this lesson finish rather than
+            # requesting the same audio twice
+            pending = self._lesson_futures.pop(lesson_number, None)
+            if pending is not None:
+                try:
+                    pending.result()
+                except Exception as e:
+                    logger.debug(f"Background audio for lesson {lesson_number} failed: {e}")
+            
             # Generate or load complete lesson audio
             audio_file = self.generate_lesson_audio(lesson_text, lesson_number)
             
@@ -495,12 +1164,7 @@ class TTSEngine:
                 return
             
             # Play the complete lesson audio
-            pygame.mixer.music.load(str(audio_file))
-            pygame.mixer.music.play()
-            
-            # Wait for playback to finish
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
+            self._play(audio_file, cache=False)
             
             logger.info(f"✓ Completed speaking Lesson {lesson_number}")
             
@@ -546,52 +1210,57 @@ class TTSEngine:
         logger.info(f"🎓 Starting to speak Lesson {lesson_number} with callbacks")
         
         try:
+            # Split lesson into sentences and clean each one once, up front.
+            # Sentences that clean to nothing (only a figure reference or
+            # marker) are skipped instead of costing a failed TTS request
+            # every time the lesson is spoken
+            sentences = self._split_into_sentences(lesson_text)
+            spoken = [
+                (i, sentence, clean)
+                for i, sentence in enumerate(sentences)
+                if (clean := self._clean_text_for_tts(sentence))
+            ]
+            
+            # Start generating their audio, so the first ones are ready by
+            # the time the intro has played
+            audio_files = self._prefetch_audio(
+                [sentence for _, sentence, _ in spoken],
+                [clean for _, _, clean in spoken]
+            )
+            
             # Introduce the lesson
             intro = f"Lesson {lesson_number}."
             intro_audio = self._generate_audio(intro)
             
             if intro_audio:
-                pygame.mixer.music.load(str(intro_audio))
-                pygame.mixer.music.play()
-                
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
+                self._play(intro_audio)
             
             # Small pause after introduction
             pygame.time.wait(1000)
             
-            # Split lesson into sentences
-            sentences = self._split_into_sentences(lesson_text)
-            
             logger.info(f"  🔊 Speaking {len(sentences)} sentences with highlighting...")
             
             # Speak each sentence with callbacks
-            for i, sentence in enumerate(sentences):
-                if sentence.strip():
-                    # Call before-speak callback (for bold highlighting)
-                    if on_sentence_start:
-                        on_sentence_start(i, sentence)
-                    
-                    # Small pause before speaking
-                    pygame.time.wait(300)
-                    
-                    # Generate and play audio
-                    logger.debug(f"  Speaking sentence {i+1}/{len(sentences)}")
-                    audio_file = self._generate_audio(sentence)
-                    
-                    if audio_file:
-                        pygame.mixer.music.load(str(audio_file))
-                        pygame.mixer.music.play()
-                        
-                        while pygame.mixer.music.get_busy():
-                            pygame.time.Clock().tick(10)
-                    
-                    # Call after-speak callback (to remove bold)
-                    if on_sentence_end:
-                        on_sentence_end(i, sentence)
-                    
-                    # Small pause between sentences
-                    pygame.time.wait(200)
+            for (i, sentence, _), audio_file in zip(spoken, audio_files):
+                # Call before-speak callback (for bold highlighting)
+                if on_sentence_start:
+                    on_sentence_start(i, sentence)
+                
+                # Small pause before speaking
+                pygame.time.wait(300)
+                
+                # Play audio (generated ahead by _prefetch_audio)
+                logger.debug(f"  Speaking sentence {i+1}/{len(sentences)}")
+                
+                if audio_file:
+                    self._play(audio_file)
+                
+                # Call after-speak callback (to remove bold)
+                if on_sentence_end:
+                    on_sentence_end(i, sentence)
+                
+                # Small pause between sentences
+                pygame.time.wait(200)
             
             logger.info(f"✓ Completed speaking Lesson {lesson_number}")
             
@@ -611,42 +1280,13 @@ class TTSEngine:
         Returns:
             List of sentences (cleaned of markers and references)
         """
-        sentences = self._split_into_sentences(lesson_text)
-        
-        # Remove markers and references from each sentence for clean display
-        clean_sentences = []
-        for sentence in sentences:
-            # Remove pacing markers
-            clean = re.sub(r'\[PAUSE\]', '', sentence, flags=re.IGNORECASE)
-            clean = re.sub(r'\[SHORT PAUSE\]', '', clean, flags=re.IGNORECASE)
-            clean = re.sub(r'\[EMPHASIS\]', '', clean, flags=re.IGNORECASE)
-            clean = re.sub(r'\[END OF LECTURE\]', '', clean, flags=re.IGNORECASE)
-            clean = re.sub(r'\[.*?\]', '', clean)  # Remove any remaining bracketed content
-            
-            # Remove figure references
-            clean = re.sub(r'\s*(?:see\s+)?\(?\s*[Ff]ig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*\)?\s*', ' ', clean, flags=re.IGNORECASE)
-            clean = re.sub(r'\s*(?:as\s+shown\s+in\s+)?[Ff]ig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*', ' ', clean, flags=re.IGNORECASE)
-            clean = re.sub(r'\s*(?:refer\s+to\s+)?[Ff]ig(?:ure)?\.?\s+\d+(?:\.\d+)?\s*', ' ', clean, flags=re.IGNORECASE)
-            
-            # Remove table references
-            clean = re.sub(r'\s*\(?\s*(?:see\s+)?[Tt]able\.?\s+\d+(?:\.\d+)?\s*\)?\s*', ' ', clean)
-            clean = re.sub(r'\s*(?:as\s+shown\s+in\s+)?[Tt]able\.?\s+\d+(?:\.\d+)?\s*', ' ', clean)
-            
-            # Remove generic image/diagram references
-            clean = re.sub(r'(?:as\s+shown\s+in\s+the\s+)(?:image|diagram|illustration|chart|graph)', '', clean, flags=re.IGNORECASE)
-            clean = re.sub(r'(?:refer\s+to\s+the\s+)(?:image|diagram|illustration|chart|graph)', '', clean, flags=re.IGNORECASE)
-            
-            # Clean up extra whitespace and punctuation
-            clean = re.sub(r'\s+', ' ', clean)
-            clean = re.sub(r'\s+([.,;:!?])', r'\1', clean)
-            clean = re.sub(r'\s+\.', '.', clean)
-            clean = re.sub(r'\s+,', ',', clean)
-            clean = clean.strip()
-            
-            if clean:  # Only add non-empty sentences
-                clean_sentences.append(clean)
-        
-        return clean_sentences
+        # Remove markers and references from each sentence, then tidy
+        # whitespace (which also trims); only non-empty sentences are kept
+        return [
+            clean
+            for sentence in self._split_into_sentences(lesson_text)
+            if (clean := _tidy_whitespace(_CLEANUP.sub(_display_replacement, sentence)))
+        ]
     
     def set_rate(self, rate: int):
         """
@@ -684,14 +1324,22 @@ class TTSEngine:
             - cache_dir: Path to cache directory
         """
         try:
-            # Count lesson directories with audio files
-            lesson_dirs = list(self.cache_dir.glob("lesson_*/"))
-            audio_files = [d / "audio.mp3" for d in lesson_dirs if (d / "audio.mp3").exists()]
-            
-            total_size = sum(f.stat().st_size for f in audio_files)
+            # Count lesson directories with audio files: one directory read,
+            # then a single stat() per lesson (a missing file is just skipped)
+            num_lessons = 0
+            total_size = 0
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if not entry.name.startswith("lesson_") or not entry.is_dir():
+                        continue
+                    try:
+                        total_size += os.stat(os.path.join(entry.path, "audio.mp3")).st_size
+                        num_lessons += 1
+                    except FileNotFoundError:
+                        pass
             
             stats = {
-                "num_lessons": len(audio_files),
+                "num_lessons": num_lessons,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
                 "cache_dir": str(self.cache_dir)
             }
@@ -705,6 +1353,7 @@ class TTSEngine:
         """Stop current speech."""
         try:
             pygame.mixer.music.stop()
+            pygame.mixer.stop()
             logger.info("Speech stopped")
         except Exception as e:
             logger.error(f"Failed to stop speech: {e}")
@@ -715,8 +1364,29 @@ class TTSEngine:
         Note: Audio cache is preserved to avoid re-fetching from Inworld API.
         """
         try:
+            # An engine shared through create_tts_engine() is only torn down
+            # by its last user; later calls must not hand out a closed engine
+            with _engine_cache_lock:
+                self._users = max(0, self._users - 1)
+                if self._users:
+                    return
+                for key in [k for k, engine in _engine_cache.items() if engine is self]:
+                    del _engine_cache[key]
+                last_engine = not _engine_cache
+            
+            self._upgrade_stop.set()
             pygame.mixer.music.stop()
-            pygame.mixer.quit()
+            pygame.mixer.stop()
+            self._pcm_lru.clear()
+            if last_engine:
+                pygame.mixer.quit()
+            
+            if self._render_pool is not None:
+                self._render_pool.shutdown(wait=False, cancel_futures=True)
+                self._render_pool = None
+            self._tts_pool.shutdown(wait=False, cancel_futures=True)
+            self._lesson_pool.shutdown(wait=False, cancel_futures=True)
+            self._http.close()
             
             # DO NOT delete audio cache - we want to keep it for future use
             # The cache saves API calls and preserves audio from free TTS period
@@ -725,6 +1395,11 @@ class TTSEngine:
             logger.error(f"Cleanup error: {e}")
 
 
+# Engines handed out by create_tts_engine(), by (pdf_hash, voice_gender, rate)
+_engine_cache: Dict[tuple, TTSEngine] = {}
+_engine_cache_lock = threading.Lock()
+
+
 def create_tts_engine(
     rate: int = 150,
     volume: float = 0.9,
@@ -734,6 +1409,9 @@ def create_tts_engine(
     """
     Factory function to create a TTS engine.
     
+    Engines are reused per (pdf_hash, voice_gender, rate) until cleaned up,
+    so switching between PDFs doesn't re-initialize audio each time.
+    
     Args:
         rate: Speech rate (words per minute)
         volume: Volume level (0.0 to 1.0)
@@ -743,4 +1421,13 @@ def create_tts_engine(
     Returns:
         TTSEngine instance
     """
-    return TTSEngine(rate=rate, volume=volume, voice_gender=voice_gender, pdf_hash=pdf_hash)
+    key = (pdf_hash, voice_gender, rate)
+    with _engine_cache_lock:
+        engine = _engine_cache.get(key)
+        if engine is None:
+            engine = TTSEngine(rate=rate, volume=volume, voice_gender=voice_gender, pdf_hash=pdf_hash)
+            _engine_cache[key] = engine
+        else:
+            engine.set_volume(volume)
+        engine._users += 1
+    return engine
@@ -3,10 +3,18 @@ import cv2
 import numpy as np
 import os
 import base64
+import logging
+import pickle
 from datetime import datetime
 import math
+import queue
+import time
 
 import threading
+from concurrent.futures import Future
+
+# Per-frame diagnostics go to the logger (debug level), not stdout
+logger = logging.getLogger(__name__)
 
 # Try importing face_recognition
 try:
@@ -16,6 +24,22 @@ except ImportError:
     FACE_RECOGNITION_AVAILABLE = False
     print("Warning: face_recognition library not found. Gaze/Drowsiness features disabled.")
 
+# Face detector: HOG on the CPU by default; dlib's CNN detector when
+# FR_USE_CUDA=1 and dlib was built with CUDA (much faster on a GPU)
+FACE_DETECTION_MODEL = 'hog'
+if FACE_RECOGNITION_AVAILABLE and os.environ.get('FR_USE_CUDA') == '1':
+    try:
+        import dlib
+        if dlib.DLIB_USE_CUDA:
+            FACE_DETECTION_MODEL = 'cnn'
+        else:
+            print("Warning: FR_USE_CUDA=1 but dlib was built without CUDA - using HOG face detection")
+    except ImportError:
+        pass
+
+# Largest face distance accepted as a match (lenient: face_recognition uses 0.6)
+MATCH_THRESHOLD = 0.65
+
 # Global model variables
 model = None
 face_cascade = None
@@ -28,6 +52,44 @@ known_face_names = []
 faces_loaded = False
 loading_lock = threading.Lock()
 
+# known_face_encodings stacked into one (N, 128) matrix, rebuilt whenever
+# the list is replaced (other modules assign it) or grows
+_known_matrix = None
+_known_matrix_source = (None, 0)
+
+# Face encodings cached per image file (see load_known_faces)
+ENCODINGS_CACHE_FILE = "encodings.pkl"
+
+# Near-identical webcam frames reuse the last analysis of the same stream:
+# mean absolute difference of 32x32 grayscale thumbnails below the threshold,
+# re-analysed at least every FRAME_REVALIDATE_EVERY frames
+FRAME_REUSE_MAD = 3.0
+FRAME_REVALIDATE_EVERY = 30
+MAX_FRAME_STREAMS = 64
+_frame_cache = {}  # stream_id -> [thumbnail, result, times reused, emotion face box]
+
+# A stream last seen attentive whose frame changed only a little only has
+# its emotion re-checked (on the last face box); if that is confidently
+# attentive, detection, landmarks, identification and pose are skipped.
+# The full pipeline still runs at least every ATTENTIVE_FAST_PATH_EVERY frames
+ATTENTIVE_FAST_PATH_MAD = 5.0
+ATTENTIVE_FAST_PATH_CONFIDENCE = 0.9
+ATTENTIVE_FAST_PATH_EVERY = 15
+_frame_cache_lock = threading.Lock()
+
+# Frames are downscaled to this width for face detection only; the box
+# is scaled back and everything else runs at full resolution
+DETECTION_WIDTH = 400
+
+# Emotion predictions from concurrent requests (one per student webcam) are
+# batched: up to EMOTION_BATCH_SIZE crops arriving within the window share
+# one model.predict call (see _predict_batched)
+EMOTION_BATCH_SIZE = 16
+EMOTION_BATCH_WINDOW = 0.02  # seconds
+_predict_queue = queue.Queue()
+_predict_worker = None
+_predict_worker_lock = threading.Lock()
+
 # Attentiveness mapping
 # Attentive emotions: Neutral, Happy, Surprise
 ATTENTIVE_EMOTIONS = ["Neutral", "Happy", "Surprise"]
@@ -42,6 +104,78 @@ YAW_THRESHOLD = 30
 PITCH_THRESHOLD_UP = -20 
 # PITCH_THRESHOLD_DOWN = 30 # Not used for distraction, as looking down is allowed
 
+# Head pose (solvePnP) constants
+# 3D Model Points (Generic face)
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),             # Nose tip
+    (0.0, -330.0, -65.0),        # Chin
+    (-225.0, 170.0, -135.0),     # Left eye left corner
+    (225.0, 170.0, -135.0),      # Right eye right corner
+    (-150.0, -150.0, -125.0),    # Left Mouth corner
+    (150.0, -150.0, -125.0)      # Right mouth corner
+], dtype=np.float64)
+DIST_COEFFS = np.zeros((4, 1))  # Assuming no lens distortion
+_camera_matrices = {}  # (w, h) -> camera matrix approximation
+_last_pose = {}  # student name -> (rotation_vector, translation_vector)
+
+# Quantized emotion model, used instead of the .h5 when present
+# (see export_quantized_emotion_model)
+EMOTION_MODEL_PATH = "custom_model_result.h5"
+QUANTIZED_MODEL_PATH = "emotion_int8.tflite"
+
+class TFLiteEmotionModel:
+    """Runs the quantized .tflite emotion model behind the Keras predict() call.
+    Not thread-safe; only the batching worker calls predict()."""
+    
+    def __init__(self, model_path):
+        import tensorflow as tf
+        self.interpreter = tf.lite.Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input['shape'][0])
+    
+    def predict(self, batch, verbose=0):
+        batch = np.asarray(batch, dtype=np.float32)
+        if len(batch) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input['index'], [len(batch), *self.input['shape'][1:]])
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = len(batch)
+        
+        # Full-integer models take int8 input and give int8 scores
+        scale, zero_point = self.input['quantization']
+        if self.input['dtype'] != np.float32:
+            limits = np.iinfo(self.input['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), limits.min, limits.max).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+        scores = self.interpreter.get_tensor(self.output['index'])
+        scale, zero_point = self.output['quantization']
+        if self.output['dtype'] != np.float32:
+            scores = (scores.astype(np.float32) - zero_point) * scale
+        return scores
+
+def export_quantized_emotion_model(face_crops=None, model_path=EMOTION_MODEL_PATH, output_path=QUANTIZED_MODEL_PATH):
+    """One-time offline conversion of the Keras emotion model to TFLite.
+    With face_crops (48x48 grayscale uint8 arrays used for calibration) the
+    model is fully INT8-quantized; without, only its weights are."""
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(model_path))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if face_crops is not None:
+        def representative_dataset():
+            for crop in face_crops:
+                yield [np.asarray(crop, dtype=np.float32)[None, :, :, None] / 255.0]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"✓ Quantized emotion model written to {output_path}")
+
 def init_emotion_model():
     """Initialize the emotion recognition model and face cascade.
     If the model fails to load, gaze/drowsiness/face-ID still work (emotion defaults to Neutral).
@@ -58,15 +192,25 @@ def init_emotion_model():
     if model is not None:
         return True
     
-    # Try loading the Haar cascade (needed for emotion crop, optional otherwise)
+    # Try loading the Haar cascade (emotion crop when face_recognition is missing)
     cascade_path = "haarcascade_frontalface_default.xml"
     if os.path.exists(cascade_path):
         face_cascade = cv2.CascadeClassifier(cascade_path)
         
+    if os.path.exists(QUANTIZED_MODEL_PATH):
+        try:
+            print("Loading quantized emotion recognition model...")
+            model = TFLiteEmotionModel(QUANTIZED_MODEL_PATH)
+            MODEL_AVAILABLE = True
+            print("✓ Quantized emotion recognition model loaded successfully")
+            return True
+        except Exception as e:
+            print(f"⚠ Quantized emotion model unavailable ({e}) — trying {EMOTION_MODEL_PATH}")
+    
     try:
         from tensorflow.keras.models import load_model
         
-        model_path = "custom_model_result.h5"
+        model_path = EMOTION_MODEL_PATH
         
         if not os.path.exists(model_path):
             print(f"⚠ Emotion model not found at {model_path} — running in gaze-only mode")
@@ -122,6 +266,21 @@ def load_known_faces(dataset_path="faces"):
                 if file.lower().endswith(('.png', '.jpg', '.jpeg')):
                     image_paths.append(os.path.join(root, file))
         
+        # Encodings from the previous run, keyed by image path (relative to
+        # the dataset) with the mtime they were computed for; only new or
+        # modified images go through the (slow) encoder again
+        cache_path = os.path.join(full_dataset_path, ENCODINGS_CACHE_FILE)
+        cached = {}
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠ Ignoring unreadable face encodings cache: {e}")
+        fresh = {}
+        reused = 0
+        
         count = 0
         for image_path in image_paths:
             parent_dir = os.path.basename(os.path.dirname(image_path))
@@ -134,9 +293,17 @@ def load_known_faces(dataset_path="faces"):
                 name = parent_dir
             
             try:
-                face_image = face_recognition.load_image_file(image_path)
-                # Use num_jitters=2 for better encoding quality
-                encodings = face_recognition.face_encodings(face_image, num_jitters=2)
+                rel_path = os.path.relpath(image_path, full_dataset_path)
+                mtime = os.path.getmtime(image_path)
+                entry = cached.get(rel_path)
+                if entry is not None and entry[0] == mtime:
+                    encodings = entry[1]
+                    reused += 1
+                else:
+                    face_image = face_recognition.load_image_file(image_path)
+                    # Use num_jitters=2 for better encoding quality
+                    encodings = face_recognition.face_encodings(face_image, num_jitters=2)[:1]
+                fresh[rel_path] = (mtime, encodings)
                 
                 if len(encodings) > 0:
                     known_face_encodings.append(encodings[0])
@@ -148,6 +315,17 @@ def load_known_faces(dataset_path="faces"):
             except Exception as e:
                 print(f"   ✗ Error processing {image_path}: {e}")
 
+        if reused != len(fresh) or len(fresh) != len(cached):
+            try:
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(fresh, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except Exception as e:
+                print(f"⚠ Could not save face encodings cache: {e}")
+        if reused:
+            print(f"   ♻ Reused cached encodings for {reused} unchanged images")
+
         print(f"✓ Faces loaded. {count} faces encoded from {len(set(known_face_names))} unique students.")
         if count > 0:
             print(f"   Students: {', '.join(sorted(set(known_face_names)))}")
@@ -170,31 +348,35 @@ def is_face_recognition_ready():
     global faces_loaded, known_face_encodings
     return faces_loaded and len(known_face_encodings) > 0
 
-def get_face_landmarks(image_rgb):
-    """Detect 68 facial landmarks using face_recognition"""
+def get_face_landmarks(image_rgb, face_locations=None):
+    """Detect 68 facial landmarks using face_recognition
+    (pass face_locations to skip its internal face detection)"""
     if not FACE_RECOGNITION_AVAILABLE:
         return None
     
-    landmarks_list = face_recognition.face_landmarks(image_rgb)
+    landmarks_list = face_recognition.face_landmarks(image_rgb, face_locations=face_locations)
     if not landmarks_list:
         return None
     return landmarks_list[0]
 
 def calculate_ear(eye_points):
     """Calculate Eye Aspect Ratio (EAR)"""
+    # Six 2D points: math.dist avoids building NumPy arrays for each pair
     # Euclidean distance between vertical eye landmarks
-    A = np.linalg.norm(np.array(eye_points[1]) - np.array(eye_points[5]))
-    B = np.linalg.norm(np.array(eye_points[2]) - np.array(eye_points[4]))
+    A = math.dist(eye_points[1], eye_points[5])
+    B = math.dist(eye_points[2], eye_points[4])
     # Euclidean distance between horizontal eye landmarks
-    C = np.linalg.norm(np.array(eye_points[0]) - np.array(eye_points[3]))
+    C = math.dist(eye_points[0], eye_points[3])
     
     if C == 0: return 0
     ear = (A + B) / (2.0 * C)
     return ear
 
-def get_head_pose(landmarks, image_shape):
+def get_head_pose(landmarks, image_shape, student_name=None):
     """
     Estimate head pose (Yaw, Pitch, Roll) using solvePnP.
+    For a recognized student, the previous frame's pose seeds the solver,
+    so it converges in a couple of iterations when the head barely moved.
     Returns (yaw, pitch, roll) in degrees.
     """
     h, w, c = image_shape
@@ -217,6 +399,8 @@ def get_head_pose(landmarks, image_shape):
     # top_lip: 0-11. Right Mouth Corner is 6 (54).
     right_mouth_corner = landmarks['top_lip'][6]
 
+    # Only these six points are converted to an array: turning every landmark
+    # into one (N, 2) array per frame costs more than the whole pose math
     image_points = np.array([
         nose_tip,             # Nose tip
         chin,                 # Chin
@@ -226,47 +410,56 @@ def get_head_pose(landmarks, image_shape):
         right_mouth_corner    # Right mouth corner
     ], dtype="double")
 
-    # 3D Model Points (Generic face)
-    model_points = np.array([
-        (0.0, 0.0, 0.0),             # Nose tip
-        (0.0, -330.0, -65.0),        # Chin
-        (-225.0, 170.0, -135.0),     # Left eye left corner
-        (225.0, 170.0, -135.0),      # Right eye right corner
-        (-150.0, -150.0, -125.0),    # Left Mouth corner
-        (150.0, -150.0, -125.0)      # Right mouth corner
-    ])
-
-    # Camera Matrix approximation
-    focal_length = w
-    center = (w / 2, h / 2)
-    camera_matrix = np.array(
-        [[focal_length, 0, center[0]],
-         [0, focal_length, center[1]],
-         [0, 0, 1]], dtype="double"
-    )
-    dist_coeffs = np.zeros((4, 1)) # Assuming no lens distortion
-
-    # Solve PnP
-    (success, rotation_vector, translation_vector) = cv2.solvePnP(model_points, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
+    # Camera Matrix approximation (one per frame size)
+    camera_matrix = _camera_matrices.get((w, h))
+    if camera_matrix is None:
+        focal_length = w
+        center = (w / 2, h / 2)
+        camera_matrix = np.array(
+            [[focal_length, 0, center[0]],
+             [0, focal_length, center[1]],
+             [0, 0, 1]], dtype="double"
+        )
+        _camera_matrices[(w, h)] = camera_matrix
+
+    # Solve PnP (seeded with the student's last pose, if any)
+    prior = _last_pose.get(student_name) if student_name not in (None, "Unknown") else None
+    if prior is not None:
+        (success, rotation_vector, translation_vector) = cv2.solvePnP(
+            MODEL_POINTS, image_points, camera_matrix, DIST_COEFFS,
+            prior[0].copy(), prior[1].copy(), useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE)
+    else:
+        (success, rotation_vector, translation_vector) = cv2.solvePnP(MODEL_POINTS, image_points, camera_matrix, DIST_COEFFS, flags=cv2.SOLVEPNP_ITERATIVE)
 
     if not success:
+        _last_pose.pop(student_name, None)
         return 0, 0, 0
+    if student_name not in (None, "Unknown"):
+        _last_pose[student_name] = (rotation_vector, translation_vector)
 
     # Get rotational matrix
     rmat, jac = cv2.Rodrigues(rotation_vector)
 
+    return _rmat_to_euler(rmat)
+
+def _rmat_to_euler(rmat):
+    """Rotation matrix -> (yaw, pitch, roll) in degrees"""
+    # Read the nine entries as Python floats once: indexing a NumPy array
+    # element by element costs more than the trigonometry itself
+    (r00, _, _), (r10, r11, r12), (r20, r21, r22) = rmat.tolist()
+
     # Get angles
     # https://stackoverflow.com/questions/15022630/how-to-calculate-the-angle-from-rotation-matrix
-    sy = math.sqrt(rmat[0, 0] * rmat[0, 0] + rmat[1, 0] * rmat[1, 0])
+    sy = math.sqrt(r00 * r00 + r10 * r10)
     singular = sy < 1e-6
 
     if not singular:
-        x = math.atan2(rmat[2, 1], rmat[2, 2])
-        y = math.atan2(-rmat[2, 0], sy)
-        z = math.atan2(rmat[1, 0], rmat[0, 0])
+        x = math.atan2(r21, r22)
+        y = math.atan2(-r20, sy)
+        z = math.atan2(r10, r00)
     else:
-        x = math.atan2(-rmat[1, 2], rmat[1, 1])
-        y = math.atan2(-rmat[2, 0], sy)
+        x = math.atan2(-r12, r11)
+        y = math.atan2(-r20, sy)
         z = 0
 
     # Convert to degrees
@@ -276,8 +469,71 @@ def get_head_pose(landmarks, image_shape):
     
     return yaw, pitch, roll
 
+def _run_predict_batches():
+    """Background worker: run queued face crops through the model in batches."""
+    while True:
+        items = [_predict_queue.get()]
+        deadline = time.monotonic() + EMOTION_BATCH_WINDOW
+        while len(items) < EMOTION_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                items.append(_predict_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        
+        try:
+            predictions = model.predict(np.stack([roi for roi, _ in items]), verbose=0)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+        else:
+            for (_, future), prediction in zip(items, predictions):
+                future.set_result(prediction)
+
+def _predict_batched(roi):
+    """Predict emotion scores for one (48, 48, 1) face crop, batched with
+    crops from concurrent requests. Blocks until the prediction is ready."""
+    global _predict_worker
+    with _predict_worker_lock:
+        if _predict_worker is None:
+            _predict_worker = threading.Thread(target=_run_predict_batches, daemon=True)
+            _predict_worker.start()
+    
+    future = Future()
+    _predict_queue.put((roi, future))
+    return future.result()
+
+def _get_known_matrix():
+    """known_face_encodings as an (N, 128) array, stacked once per change."""
+    global _known_matrix, _known_matrix_source
+    encodings = known_face_encodings
+    source, count = _known_matrix_source
+    if _known_matrix is None or source is not encodings or count != len(encodings):
+        _known_matrix = np.asarray(encodings, dtype=np.float64)
+        _known_matrix_source = (encodings, len(encodings))
+    return _known_matrix
+
+def _predict_emotion(gray, box):
+    """Emotion for the (x, y, w, h) face box of a grayscale frame.
+    Returns (emotion, confidence), or None for a blank crop."""
+    (x, y, w, h) = box
+    roi_gray = gray[y:y + h, x:x + w]
+    roi_gray = cv2.resize(roi_gray, (48, 48), interpolation=cv2.INTER_AREA)
+    if not roi_gray.any():
+        return None
+    
+    # (48, 48, 1) float32 crop, as img_to_array built
+    roi = roi_gray.astype(np.float32)[:, :, None] / 255.0
+    prediction = _predict_batched(roi)
+    maxindex = int(np.argmax(prediction))
+    return emotion_dict[maxindex], float(prediction[maxindex])
+
 def identify_face(face_encoding):
-    """Matches a face encoding to known faces"""
+    """Matches a face encoding to known faces.
+    Returns (name, distance, confidence_pct): distance 0.0 = 100%,
+    MATCH_THRESHOLD and beyond = 0% (and name "Unknown")."""
     global known_face_encodings, known_face_names, faces_loaded
     
     name = "Unknown"
@@ -288,33 +544,46 @@ def identify_face(face_encoding):
         load_known_faces()
     
     if not known_face_encodings:
-        print("⚠ No known faces loaded for recognition")
-        return name, confidence_score
+        logger.debug("⚠ No known faces loaded for recognition")
+        return name, confidence_score, 0.0
         
-    face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-    best_match_index = np.argmin(face_distances)
-    confidence_score = face_distances[best_match_index]
+    # Squared Euclidean distances (face_recognition.face_distance without the
+    # square roots), against the known encodings stacked once; only the top
+    # matches' distances are needed
+    diff = _get_known_matrix() - face_encoding
+    squared_distances = np.einsum('ij,ij->i', diff, diff)
+    
+    # Sort distances to view top matches (stable: ties go to the first, as argmin)
+    top_indices = np.argsort(squared_distances, kind='stable')[:3]
+    top_distances = np.sqrt(squared_distances[top_indices])
+    best_match_index = top_indices[0]
+    confidence_score = top_distances[0]
     
-    # Sort distances to view top matches
-    top_indices = np.argsort(face_distances)[:3]
-    print(f"   🔍 Face Matches: ", end="")
-    for idx in top_indices:
-        print(f"{known_face_names[idx]} ({face_distances[idx]:.3f}) | ", end="")
-    print("")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   🔍 Face Matches: " + "".join(
+            f"{known_face_names[idx]} ({distance:.3f}) | " for idx, distance in zip(top_indices, top_distances)))
 
     # Use a more lenient threshold (0.65 instead of 0.6) for better recognition
-    # Also return confidence for better tracking
-    if face_distances[best_match_index] < 0.65:
+    # Also return confidence for better tracking: linear from 100% at
+    # distance 0.0 down to 0% at the threshold
+    if confidence_score < MATCH_THRESHOLD:
         name = known_face_names[best_match_index]
-        print(f"✓ Recognized: {name} (distance: {face_distances[best_match_index]:.3f})")
+        confidence_pct = max(0.0, min(100.0, (MATCH_THRESHOLD - confidence_score) / MATCH_THRESHOLD * 100))
+        logger.debug(f"✓ Recognized: {name} (distance: {confidence_score:.3f})")
     else:
-        print(f"✗ No match found (best distance: {face_distances[best_match_index]:.3f}, threshold: 0.65)")
+        confidence_pct = 0.0
+        logger.debug(f"✗ No match found (best distance: {confidence_score:.3f}, threshold: {MATCH_THRESHOLD})")
         
-    return name, confidence_score
+    return name, confidence_score, confidence_pct
 
-def analyze_emotion_from_base64(base64_string):
+def analyze_emotion_from_base64(base64_string, stream_id=None):
     """
     Analyze emotion, gaze, and drowsiness from a base64 encoded image string.
+    
+    A frame nearly identical to the last one analysed for the same stream_id
+    (e.g. the user's webcam) returns that analysis again without re-running
+    the detectors. Without a stream_id nothing is cached, since frames from
+    different clients could otherwise be matched to each other.
     Returns:
         dict: {
             'success': bool,
@@ -334,50 +603,92 @@ def analyze_emotion_from_base64(base64_string):
 
     try:
         # Decode base64 image
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
+        # Strip a "data:image/...;base64," prefix (partition: one copy, no list)
+        _, comma, payload = base64_string.partition(',')
+        if comma:
+            base64_string = payload
             
-        img_data = base64.b64decode(base64_string)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img = cv2.imdecode(np.frombuffer(base64.b64decode(base64_string), np.uint8), cv2.IMREAD_COLOR)
         
         if img is None:
             return {'success': False, 'message': 'Failed to decode image'}
 
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        fast_path_box = None
+        if stream_id is not None:
+            thumb = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+            with _frame_cache_lock:
+                last = _frame_cache.get(stream_id)
+                if last is not None:
+                    mad = np.mean(cv2.absdiff(thumb, last[0]))
+                    if last[2] < FRAME_REVALIDATE_EVERY and mad < FRAME_REUSE_MAD:
+                        last[2] += 1
+                        return dict(last[1])
+                    if (last[1]['is_attentive'] and last[2] < ATTENTIVE_FAST_PATH_EVERY
+                            and mad < ATTENTIVE_FAST_PATH_MAD):
+                        fast_path_box = last[3]
+
+        if fast_path_box is not None and MODEL_AVAILABLE and model is not None:
+            try:
+                predicted = _predict_emotion(gray, fast_path_box)
+            except Exception as em_err:
+                print(f"⚠ Emotion prediction error: {em_err}")
+                predicted = None
+            if (predicted and predicted[0] in ATTENTIVE_EMOTIONS
+                    and predicted[1] > ATTENTIVE_FAST_PATH_CONFIDENCE):
+                with _frame_cache_lock:
+                    last[2] += 1
+                return dict(last[1], emotion=predicted[0], confidence=predicted[1])
+
         # Default emotion — used when model is unavailable
         emotion_result = "Neutral"
         confidence = 0.0
         face_detected = False
+        emotion_box = None
         student_name = "Unknown"
 
+        # 0. FACE DETECTION — one detector pass (upsample=2 helps with smaller/farther
+        # faces); the largest face's box feeds the emotion crop, landmarks and
+        # the encoding, so none of them detects faces again
+        face_locs = []
+        if FACE_RECOGNITION_AVAILABLE:
+            image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img_h, img_w = image_rgb.shape[:2]
+            
+            # Detection cost grows with pixel count: detect on a downscaled copy
+            scale = min(1.0, DETECTION_WIDTH / img_w)
+            small_rgb = image_rgb if scale == 1.0 else cv2.resize(
+                image_rgb, (DETECTION_WIDTH, int(img_h * scale)), interpolation=cv2.INTER_AREA)
+            face_locs = face_recognition.face_locations(small_rgb, number_of_times_to_upsample=2, model=FACE_DETECTION_MODEL)
+            if face_locs:
+                # (top, right, bottom, left), mapped back to full resolution
+                t, r, b, l = max(face_locs, key=lambda b: (b[2] - b[0]) * (b[1] - b[3]))
+                face_locs = [(
+                    max(0, int(t / scale)), min(img_w, int(r / scale)),
+                    min(img_h, int(b / scale)), max(0, int(l / scale))
+                )]
+
         # 1. EMOTION DETECTION — only if model loaded successfully
-        if MODEL_AVAILABLE and model is not None and face_cascade is not None:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+        if MODEL_AVAILABLE and model is not None:
+            if FACE_RECOGNITION_AVAILABLE:
+                faces = [(l, t, r - l, b - t) for (t, r, b, l) in face_locs]
+            elif face_cascade is not None:
+                faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+                faces = sorted(faces, key=lambda x: x[2] * x[3], reverse=True)
+            else:
+                faces = []
             
             if len(faces) > 0:
                 face_detected = True
-                faces = sorted(faces, key=lambda x: x[2] * x[3], reverse=True)
-                (x, y, w, h) = faces[0]
-                
-                roi_gray = gray[y:y + h, x:x + w]
-                roi_gray = cv2.resize(roi_gray, (48, 48), interpolation=cv2.INTER_AREA)
+                emotion_box = tuple(int(v) for v in faces[0])
                 
-                if np.sum([roi_gray]) != 0:
-                    roi = roi_gray.astype('float') / 255.0
-                    roi = np.expand_dims(roi, axis=0)
-                    
-                    try:
-                        from tensorflow.keras.preprocessing.image import img_to_array
-                        roi = img_to_array(roi[0])
-                        roi = np.expand_dims(roi, axis=0)
-                        prediction = model.predict(roi, verbose=0)[0]
-                        maxindex = int(np.argmax(prediction))
-                        emotion_result = emotion_dict[maxindex]
-                        confidence = float(prediction[maxindex])
-                    except Exception as em_err:
-                        print(f"⚠ Emotion prediction error: {em_err}")
-                        emotion_result = "Neutral"
+                try:
+                    predicted = _predict_emotion(gray, emotion_box)
+                    if predicted:
+                        emotion_result, confidence = predicted
+                except Exception as em_err:
+                    print(f"⚠ Emotion prediction error: {em_err}")
+                    emotion_result = "Neutral"
         # If model not available, gaze/face-recognition path below still runs
 
         # 2. GAZE, DROWSINESS & IDENTIFICATION
@@ -386,29 +697,20 @@ def analyze_emotion_from_base64(base64_string):
         recognition_confidence = 0.0
         
         if FACE_RECOGNITION_AVAILABLE:
-            image_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            landmarks = get_face_landmarks(image_rgb)
+            landmarks = get_face_landmarks(image_rgb, face_locs) if face_locs else None
             
             # Identify Face - CRITICAL: This must work for individual student tracking
-            # Detect face locations first (upsample=2 helps with smaller/farther faces)
-            face_locs = face_recognition.face_locations(image_rgb, number_of_times_to_upsample=2, model='hog')
-            face_encodings = face_recognition.face_encodings(image_rgb, known_face_locations=face_locs, num_jitters=1)
+            face_encodings = face_recognition.face_encodings(image_rgb, known_face_locations=face_locs, num_jitters=1) if face_locs else []
             if face_encodings:
-                student_name, face_distance = identify_face(face_encodings[0])
-                # Convert distance to confidence percentage (distance 0.0 = 100%, distance 0.65 = 0%)
-                # Use linear mapping: confidence = (0.65 - distance) / 0.65 * 100
-                if face_distance < 0.65:
-                    recognition_confidence = max(0.0, min(100.0, ((0.65 - face_distance) / 0.65) * 100))
-                else:
-                    recognition_confidence = 0.0
+                student_name, _, recognition_confidence = identify_face(face_encodings[0])
             else:
-                print("⚠ No face encodings generated from image")
+                logger.debug("⚠ No face encodings generated from image")
                 student_name = "Unknown"
                 recognition_confidence = 0.0
             
             if landmarks:
                 # Gaze Estimation
-                yaw, pitch, roll = get_head_pose(landmarks, img.shape)
+                yaw, pitch, roll = get_head_pose(landmarks, img.shape, student_name)
                 
                 # Drowsiness
                 left_ear = calculate_ear(landmarks['left_eye'])
@@ -457,7 +759,7 @@ def analyze_emotion_from_base64(base64_string):
                     status_message = "Attentive"
                     
                 # Debug print
-                print(f"User: {student_name}, Yaw: {yaw:.1f}, Pitch: {pitch:.1f}, EAR: {avg_ear:.2f}, TakingNotes: {is_taking_notes} -> {status_message}")
+                logger.debug(f"User: {student_name}, Yaw: {yaw:.1f}, Pitch: {pitch:.1f}, EAR: {avg_ear:.2f}, TakingNotes: {is_taking_notes} -> {status_message}")
                 
             else:
                 is_attentive = emotion_result in ATTENTIVE_EMOTIONS
@@ -466,7 +768,7 @@ def analyze_emotion_from_base64(base64_string):
              is_attentive = emotion_result in ATTENTIVE_EMOTIONS
              status_message = "Attentive (Emotion Only)"
 
-        return {
+        result = {
             'success': True,
             'emotion': f"{emotion_result} | {status_message}" if "Distracted" in status_message else emotion_result,
             'is_attentive': is_attentive,
@@ -475,6 +777,15 @@ def analyze_emotion_from_base64(base64_string):
             'recognition_confidence': recognition_confidence if FACE_RECOGNITION_AVAILABLE else 0.0,
             'distraction_reason': status_message if not is_attentive else None  # Add distraction reason
         }
+
+        if stream_id is not None:
+            with _frame_cache_lock:
+                _frame_cache.pop(stream_id, None)
+                _frame_cache[stream_id] = [thumb, result, 0, emotion_box]
+                if len(_frame_cache) > MAX_FRAME_STREAMS:
+                    del _frame_cache[next(iter(_frame_cache))]
+
+        return dict(result)
             
     except Exception as e:
         print(f"Error in analyze_emotion: {e}")
@@ -3,44 +3,132 @@ PDF and document parsing utilities for study materials
 Extracts text from PDF, DOCX, and TXT files
 """
 
+import functools
+import hashlib
+import multiprocessing
 import os
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# PDFium (native) text extraction, much faster than PyPDF2 (optional)
+try:
+    import pypdfium2 as pdfium
+    _HAS_PDFIUM = True
+except ImportError:
+    _HAS_PDFIUM = False
+
+# Plain-text DOCX extraction without building python-docx's document model (optional)
+try:
+    import docx2txt
+    _HAS_DOCX2TXT = True
+except ImportError:
+    _HAS_DOCX2TXT = False
+
+# PDFium is not thread-safe; requests extracting concurrently take turns
+_pdfium_lock = threading.Lock()
+
+# Extracted PDF/DOCX text is cached on disk (and the most recent documents
+# in memory), keyed by path, modification time and size
+TEXT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'pdf_text')
+
+# PDFs with at least this many pages are split across worker processes,
+# PAGES_PER_WORKER_TASK consecutive pages per task
+PARALLEL_MIN_PAGES = 32
+PAGES_PER_WORKER_TASK = 16
+MAX_PAGE_WORKERS = 4
+
+# One pool for the life of the process, created on the first large PDF
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Shared worker pool for PyPDF2 page extraction"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # Never fork the (heavily threaded) server process; forkserver
+            # workers start from a clean helper process where available
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _page_pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, MAX_PAGE_WORKERS),
+                mp_context=multiprocessing.get_context(method)
+            )
+        return _page_pool
+
+def _extract_page_range(args: Tuple[str, int, int]) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF (runs in a worker process)"""
+    import PyPDF2
+    filepath, start, stop = args
+    with open(filepath, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+
+def _extract_text_pdfium(filepath: str) -> str:
+    """Extract text from PDF file with PDFium"""
+    parts = []
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(filepath)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    # PDFium separates lines with CRLF
+    return "\n\n".join(parts).replace("\r\n", "\n").strip()
 
 def extract_text_from_pdf(filepath: str) -> str:
-    """Extract text from PDF file"""
+    """Extract text from PDF file (PDFium if installed, else PyPDF2, then pdfplumber)"""
+    if _HAS_PDFIUM:
+        try:
+            return _extract_text_pdfium(filepath)
+        except Exception as e:
+            print(f"Error extracting PDF text with PDFium: {e}")
     try:
         import PyPDF2
-        text = ""
         with open(filepath, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n\n"
-        return text.strip()
+            num_pages = len(pdf_reader.pages)
+            if num_pages < PARALLEL_MIN_PAGES:
+                pages = [page.extract_text() for page in pdf_reader.pages]
+            else:
+                pages = None
+        
+        if pages is None:
+            # Large PDF: text extraction is CPU-bound, so spread page ranges
+            # over the worker processes (each worker opens the file itself)
+            ranges = [
+                (filepath, start, min(start + PAGES_PER_WORKER_TASK, num_pages))
+                for start in range(0, num_pages, PAGES_PER_WORKER_TASK)
+            ]
+            pages = [text for chunk in _get_page_pool().map(_extract_page_range, ranges) for text in chunk]
+        return "\n\n".join(pages).strip()
     except Exception as e:
         print(f"Error extracting PDF text: {e}")
         # Fallback to pdfplumber
         try:
             import pdfplumber
-            text = ""
             with pdfplumber.open(filepath) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"
-            return text.strip()
+                pages = [page_text for page in pdf.pages if (page_text := page.extract_text())]
+            return "\n\n".join(pages).strip()
         except Exception as e2:
             print(f"Error with pdfplumber: {e2}")
             return ""
 
 def extract_text_from_docx(filepath: str) -> str:
-    """Extract text from DOCX file"""
+    """Extract text from DOCX file (docx2txt if installed, else python-docx)"""
+    if _HAS_DOCX2TXT:
+        try:
+            return docx2txt.process(filepath).strip()
+        except Exception as e:
+            print(f"Error extracting DOCX text with docx2txt: {e}")
     try:
         from docx import Document
         doc = Document(filepath)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
     except Exception as e:
         print(f"Error extracting DOCX text: {e}")
         return ""
@@ -54,6 +142,29 @@ def extract_text_from_txt(filepath: str) -> str:
         print(f"Error reading TXT file: {e}")
         return ""
 
+@functools.lru_cache(maxsize=16)
+def _extract_text_cached(filepath: str, mtime_ns: int, size: int, ext: str) -> str:
+    """Extract PDF/DOCX text, reusing the on-disk copy for an unchanged file"""
+    key = hashlib.sha1(f"{filepath}|{mtime_ns}|{size}".encode('utf-8')).hexdigest()
+    cache_path = os.path.join(TEXT_CACHE_DIR, f"{key}.txt")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            return file.read()
+    except OSError:
+        pass
+    
+    text = extract_text_from_pdf(filepath) if ext == '.pdf' else extract_text_from_docx(filepath)
+    if text:
+        try:
+            os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache extracted text: {e}")
+    return text
+
 def extract_text_from_file(filepath: str) -> str:
     """
     Extract text from file based on extension
@@ -61,10 +172,13 @@ def extract_text_from_file(filepath: str) -> str:
     """
     ext = os.path.splitext(filepath)[1].lower()
     
-    if ext == '.pdf':
-        return extract_text_from_pdf(filepath)
-    elif ext in ['.docx', '.doc']:
-        return extract_text_from_docx(filepath)
+    if ext in ['.pdf', '.docx', '.doc']:
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            print(f"Error reading file: {e}")
+            return ""
+        return _extract_text_cached(os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size, ext)
     elif ext == '.txt':
         return extract_text_from_txt(filepath)
     else:
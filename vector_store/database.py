@@ -30,9 +30,49 @@ Supported backends:
 
 import logging
 import os
-from typing import List, Optional, Dict, Any, Tuple
+import threading
+from typing import List, Optional, Dict, Any, NamedTuple, Tuple
 from pathlib import Path
 
+import numpy as np
+
+# Optional SIMD distance kernels (AVX-512 / NEON)
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    simsimd = None
+    SIMSIMD_AVAILABLE = False
+
+# Unfiltered searches scan an in-memory matrix up to this many chunks; larger
+# collections are served by ChromaDB's HNSW (approximate nearest neighbour)
+# index instead (20000 x 1536-dim float32 is ~120 MB). Set
+# VECTOR_EXACT_SEARCH_MAX_DOCS=0 to always use HNSW.
+_EXACT_SEARCH_MAX_DOCS = int(os.getenv("VECTOR_EXACT_SEARCH_MAX_DOCS", "20000"))
+
+# Rows fetched from ChromaDB per call while building the matrix, so only one
+# page at a time exists as Python lists
+_LOAD_PAGE_SIZE = 2048
+
+# int8 coarse scan (SimSIMD only): used once the corpus has this many chunks.
+# The top (top_k * _RERANK_FACTOR) int8 candidates are re-scored in float32.
+_INT8_SCAN_MIN_DOCS = 10000
+_RERANK_FACTOR = 4
+
+
+class _SearchSnapshot(NamedTuple):
+    """Everything an exact search reads, published together by _load_matrix."""
+    space: str
+    matrix: np.ndarray                 # (N, D) float32 embeddings
+    sq_norms: np.ndarray               # (N,) squared row norms
+    norms: np.ndarray                  # (N,) row norms
+    matrix_i8: Optional[np.ndarray]    # int8 copy for the coarse scan, or None
+    i8_scale: float
+    documents: List[str]
+    metadatas: List[Dict[str, Any]]
+    stamp: Tuple                       # _collection_stamp() it was built at
+
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -103,6 +143,16 @@ class VectorDatabase:
             # Get current document count
             doc_count = self.collection.count()
             
+            # Distance metric of the collection's HNSW index (ChromaDB default: l2)
+            self._space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+            
+            # In-memory snapshot of the collection for exact search
+            # (built lazily by _load_matrix, dropped whenever the collection
+            # changes). Searches on other threads read it once and keep using
+            # their copy, so it is only ever replaced whole, never mutated.
+            self._snapshot: Optional[_SearchSnapshot] = None
+            self._snapshot_lock = threading.Lock()
+            
             logger.info(
                 f"VectorDatabase initialized: collection='{collection_name}', "
                 f"documents={doc_count}"
@@ -177,6 +227,7 @@ class VectorDatabase:
                 documents=chunks,
                 metadatas=metadata
             )
+            self._invalidate_snapshot()
             
             logger.info(
                 f"✓ Successfully added {len(chunks)} documents. "
@@ -224,6 +275,13 @@ class VectorDatabase:
         logger.info(f"Performing similarity search (top_k={top_k})")
         
         try:
+            # Exact in-memory search (metadata filters still go through ChromaDB)
+            snapshot = self._load_matrix() if filter_metadata is None else None
+            if snapshot is not None:
+                results = self._exact_search(snapshot, query_embedding, top_k)
+                logger.info(f"Found {len(results)} results")
+                return results
+            
             # Query ChromaDB
             results = self.collection.query(
                 query_embeddings=[query_embedding],
@@ -255,6 +313,213 @@ class VectorDatabase:
             logger.error(f"Similarity search failed: {e}")
             raise
     
+    def similarity_search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """
+        Perform semantic similarity search for several queries at once.
+        
+        All queries are sent to ChromaDB in a single call, which is much
+        cheaper than issuing one similarity_search() per query.
+        
+        Args:
+            query_embeddings: List of query vectors
+            top_k: Number of top results to return per query (default: 5)
+            filter_metadata: Optional metadata filters applied to every query
+        
+        Returns:
+            One result list per query, in the same order as query_embeddings.
+            Each result list has the same format as similarity_search().
+        """
+        if not query_embeddings:
+            logger.warning("No query embeddings provided")
+            return []
+        
+        logger.info(
+            f"Performing batched similarity search "
+            f"({len(query_embeddings)} queries, top_k={top_k})"
+        )
+        
+        try:
+            # Exact in-memory search: all queries scored by one matrix product
+            snapshot = self._load_matrix() if filter_metadata is None else None
+            if snapshot is not None:
+                return self._exact_search_batch(snapshot, query_embeddings, top_k)
+            
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=top_k,
+                where=filter_metadata,
+                include=["documents", "distances", "metadatas"]
+            )
+            
+            all_documents = results["documents"] or []
+            all_distances = results["distances"] or []
+            all_metadatas = results["metadatas"] or []
+            
+            batched_results = []
+            for documents, distances, metadatas in zip(all_documents, all_distances, all_metadatas):
+                batched_results.append([
+                    (doc, 1.0 / (1.0 + dist), meta)
+                    for doc, dist, meta in zip(documents, distances, metadatas)
+                ])
+            
+            return batched_results
+        
+        except Exception as e:
+            logger.error(f"Batched similarity search failed: {e}")
+            raise
+
+    def _invalidate_snapshot(self):
+        """Drop the exact-search snapshot after the collection changed."""
+        with self._snapshot_lock:
+            self._snapshot = None
+    
+    def _collection_stamp(self, count: int) -> Tuple:
+        """
+        Change marker for the collection: its size plus the modification
+        times of ChromaDB's SQLite store, so writes from another instance or
+        process that keep the count the same still invalidate the snapshot.
+        """
+        mtimes = []
+        for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+            try:
+                mtimes.append(os.stat(os.path.join(self.persist_directory, name)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return (count, *mtimes)
+    
+    def _load_matrix(self) -> Optional[_SearchSnapshot]:
+        """
+        Build (or refresh) the in-memory snapshot used by _exact_search.
+        
+        Embeddings are stored as one contiguous float32 (N, D) array with the
+        documents and metadata kept in parallel lists, so scoring a batch of
+        queries is a single matrix product instead of a per-document loop.
+        Row norms are computed once here rather than on every query. Rows are
+        read from ChromaDB a page at a time straight into the matrix.
+        
+        Returns:
+            The snapshot, or None if the collection is empty or too large for
+            a linear scan (callers then query the HNSW index)
+        """
+        with self._snapshot_lock:
+            count = self.collection.count()
+            stamp = self._collection_stamp(count)
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.stamp == stamp:
+                return snapshot
+            
+            self._snapshot = None
+            if count == 0 or count > _EXACT_SEARCH_MAX_DOCS:
+                return None
+            
+            matrix = None
+            documents: List[str] = []
+            metadatas: List[Dict[str, Any]] = []
+            for offset in range(0, count, _LOAD_PAGE_SIZE):
+                page = self.collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=_LOAD_PAGE_SIZE,
+                    offset=offset
+                )
+                rows = page["embeddings"]
+                if len(rows) == 0 or len(documents) + len(rows) > count:
+                    break
+                if matrix is None:
+                    matrix = np.empty((count, len(rows[0])), dtype=np.float32)
+                matrix[len(documents):len(documents) + len(rows)] = rows
+                documents.extend(page["documents"])
+                metadatas.extend(page["metadatas"])
+            
+            if len(documents) != count:
+                # Written to while paging; the next search tries again
+                logger.debug("Collection changed while loading the embedding matrix")
+                return None
+            
+            sq_norms = np.einsum('ij,ij->i', matrix, matrix)
+            
+            # int8 copy with one symmetric scale: 4x less memory traffic per scan
+            matrix_i8 = None
+            i8_scale = 1.0
+            if SIMSIMD_AVAILABLE and count >= _INT8_SCAN_MIN_DOCS:
+                i8_scale = 127.0 / (float(np.abs(matrix).max()) or 1.0)
+                matrix_i8 = _quantize(matrix, i8_scale)
+            
+            snapshot = self._snapshot = _SearchSnapshot(
+                space=self._space,
+                matrix=matrix,
+                sq_norms=sq_norms,
+                norms=np.sqrt(sq_norms),
+                matrix_i8=matrix_i8,
+                i8_scale=i8_scale,
+                documents=documents,
+                metadatas=metadatas,
+                stamp=stamp,
+            )
+        
+        logger.info(f"Loaded embedding matrix for exact search: {matrix.shape}")
+        return snapshot
+    
+    def _exact_search(
+        self,
+        snapshot: _SearchSnapshot,
+        query_embedding: List[float],
+        top_k: int
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Exact top-k search over the in-memory embedding matrix.
+        
+        Returns results in the same format as similarity_search().
+        """
+        return self._exact_search_batch(snapshot, [query_embedding], top_k)[0]
+    
+    def _exact_search_batch(
+        self,
+        snapshot: _SearchSnapshot,
+        query_embeddings: List[List[float]],
+        top_k: int
+    ) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """
+        Exact top-k search for several queries over the in-memory matrix.
+        
+        On large corpora (with SimSIMD) the full scan runs on the int8 copy
+        and only the best candidates are re-scored in float32, so returned
+        scores are still exact.
+        
+        Returns results in the same format as similarity_search_batch().
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        
+        if snapshot.matrix_i8 is not None:
+            n_candidates = min(top_k * _RERANK_FACTOR, len(snapshot.matrix))
+            rows = _coarse_candidates(snapshot, queries, n_candidates)
+            distances = _candidate_distances(snapshot, queries, rows)
+        else:
+            distances = _distances(snapshot, queries)
+            rows = None
+        
+        k = min(top_k, distances.shape[1])
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(
+            top, np.argsort(np.take_along_axis(distances, top, axis=1), axis=1), axis=1
+        )
+        top_distances = np.take_along_axis(distances, top, axis=1)
+        if rows is not None:
+            top = np.take_along_axis(rows, top, axis=1)
+        
+        documents, metadatas = snapshot.documents, snapshot.metadatas
+        return [
+            [
+                (documents[i], 1.0 / (1.0 + float(dist)), metadatas[i])
+                for i, dist in zip(row_top, row_distances)
+            ]
+            for row_top, row_distances in zip(top, top_distances)
+        ]
+    
     def get_document_count(self) -> int:
         """
         Get the total number of documents in the collection.
@@ -288,6 +553,7 @@ class VectorDatabase:
         
         try:
             self.collection.delete(ids=document_ids)
+            self._invalidate_snapshot()
             logger.info(f"✓ Deleted {len(document_ids)} documents")
             return len(document_ids)
             
@@ -314,6 +580,8 @@ class VectorDatabase:
                 name=self.collection_name,
                 metadata={"description": "AI Tutor document chunks for RAG"}
             )
+            self._space = "l2"
+            self._invalidate_snapshot()
             
             logger.info("✓ Collection cleared successfully")
             return True
@@ -337,6 +605,82 @@ class VectorDatabase:
         }
 
 
+def _distances(snapshot: _SearchSnapshot, queries: np.ndarray) -> np.ndarray:
+    """
+    Distance from each query vector (Q, D) to every stored embedding.
+    
+    Uses the same metric as the collection's HNSW index so scores match
+    what ChromaDB would return. SimSIMD kernels are used when installed;
+    the NumPy fallback is one (Q, D) x (D, N) matrix product plus the
+    precomputed row norms.
+    
+    Returns:
+        (Q, N) array of distances
+    """
+    if SIMSIMD_AVAILABLE:
+        return _simsimd_distances(snapshot.space, queries, snapshot.matrix)
+    
+    dots = queries @ snapshot.matrix.T
+    if snapshot.space == "cosine":
+        norms = np.outer(np.linalg.norm(queries, axis=1), snapshot.norms)
+        return 1.0 - dots / np.maximum(norms, 1e-12)
+    if snapshot.space == "ip":
+        return 1.0 - dots
+    q_sq = np.einsum('ij,ij->i', queries, queries)
+    return snapshot.sq_norms[None, :] - 2.0 * dots + q_sq[:, None]
+
+
+def _simsimd_distances(space: str, queries: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    SimSIMD cdist in the collection's distance space.
+    
+    The ip space is computed with NumPy instead: SimSIMD's "inner" metric
+    has returned the raw dot product in some releases and 1 - dot in
+    others, which would silently invert the ranking.
+    """
+    if space == "ip":
+        # int8 rows (coarse scan) accumulate in int32 so the dots don't overflow
+        dtype = np.int32 if matrix.dtype == np.int8 else None
+        return 1.0 - np.matmul(queries, matrix.T, dtype=dtype)
+    metric = {"l2": "sqeuclidean", "cosine": "cosine"}[space]
+    return np.asarray(simsimd.cdist(queries, matrix, metric=metric))
+
+
+def _quantize(vectors: np.ndarray, scale: float) -> np.ndarray:
+    """Quantize float32 vectors to int8 with the corpus scale."""
+    return np.clip(np.round(vectors * scale), -127, 127).astype(np.int8)
+
+
+def _coarse_candidates(snapshot: _SearchSnapshot, queries: np.ndarray, n_candidates: int) -> np.ndarray:
+    """
+    Indices of the n_candidates nearest rows per query, from an int8 scan.
+    
+    Returns:
+        (Q, n_candidates) array of row indices (unordered)
+    """
+    coarse = _simsimd_distances(
+        snapshot.space, _quantize(queries, snapshot.i8_scale), snapshot.matrix_i8
+    )
+    return np.argpartition(coarse, n_candidates - 1, axis=1)[:, :n_candidates]
+
+
+def _candidate_distances(snapshot: _SearchSnapshot, queries: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Exact float32 distances from each query to its own candidate rows.
+    
+    Returns:
+        (Q, C) array of distances, aligned with candidates
+    """
+    dots = np.einsum('qcd,qd->qc', snapshot.matrix[candidates], queries)
+    if snapshot.space == "cosine":
+        norms = snapshot.norms[candidates] * np.linalg.norm(queries, axis=1)[:, None]
+        return 1.0 - dots / np.maximum(norms, 1e-12)
+    if snapshot.space == "ip":
+        return 1.0 - dots
+    q_sq = np.einsum('ij,ij->i', queries, queries)
+    return snapshot.sq_norms[candidates] - 2.0 * dots + q_sq[:, None]
+
+
 # Convenience function for simple usage
 def create_vector_db(
     collection_name: str = "ai_tutor_documents",
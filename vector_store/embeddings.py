@@ -8,17 +8,31 @@ Supported providers:
 - Google Gemini embeddings (text-embedding-004)
 """
 
+import collections
+import hashlib
 import logging
 import os
+import sqlite3
+import threading
+from pathlib import Path
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
+import numpy as np
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Texts per embeddings request (Gemini accepts up to 100 per call)
+EMBEDDING_BATCH_SIZE = 100
+
+# Embeddings kept in memory (LRU); older ones are served from SQLite.
+# A 1536-dim vector as a Python list is ~50 KB, so this caps the tier at ~50 MB
+EMBEDDING_MEMORY_CACHE_SIZE = 1024
+
 
 class EmbeddingProvider(Enum):
     """Supported embedding providers."""
@@ -26,6 +40,60 @@ class EmbeddingProvider(Enum):
     GEMINI = "gemini"
 
 
+class EmbeddingCache:
+    """Persistent embedding cache keyed by SHA-256 of (model, text), with an in-memory tier."""
+    
+    def __init__(self, db_path: str = "./data/embeddings_cache.sqlite"):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory: "collections.OrderedDict[str, List[float]]" = collections.OrderedDict()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def _key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+    
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        key = self._key(model_name, text)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                return embedding
+            
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        
+        embedding = np.frombuffer(row[0], dtype=np.float32).tolist()
+        self._remember(key, embedding)
+        return embedding
+    
+    def put(self, model_name: str, text: str, embedding: List[float]):
+        key = self._key(model_name, text)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                (key, np.asarray(embedding, dtype=np.float32).tobytes())
+            )
+            self._conn.commit()
+        self._remember(key, list(embedding))
+    
+    def _remember(self, key: str, embedding: List[float]):
+        """Add an embedding to the in-memory LRU, evicting the oldest."""
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            if len(self._memory) > EMBEDDING_MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+
 class EmbeddingGenerator:
     """Generate embeddings for text chunks using various API providers."""
     
@@ -59,6 +127,7 @@ class EmbeddingGenerator:
         
         self.api_key = api_key
         self.client = None
+        self._cache: Optional[EmbeddingCache] = None
         self._initialize_client()
         
         logger.info(f"EmbeddingGenerator initialized: provider={self.provider}, model={self.model_name}")
@@ -115,6 +184,40 @@ class EmbeddingGenerator:
             logger.error(f"Error generating embedding: {e}")
             raise Exception(f"Failed to generate embedding: {str(e)}")
     
+    def _get_cache(self) -> EmbeddingCache:
+        if self._cache is None:
+            self._cache = EmbeddingCache()
+        return self._cache
+    
+    def generate_embedding_cached(self, text: str) -> List[float]:
+        """Like generate_embedding, but served from the embedding cache when possible."""
+        cache = self._get_cache()
+        embedding = cache.get(self.model_name, text)
+        if embedding is None:
+            embedding = self.generate_embedding(text)
+            if embedding:
+                cache.put(self.model_name, text, embedding)
+        return embedding
+    
+    def generate_embeddings_batch_cached(
+        self,
+        texts: List[str],
+        show_progress: bool = True
+    ) -> List[List[float]]:
+        """Like generate_embeddings_batch, but only texts missing from the cache are embedded."""
+        cache = self._get_cache()
+        embeddings = [cache.get(self.model_name, text) for text in texts]
+        
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            fresh = self.generate_embeddings_batch([texts[i] for i in misses], show_progress)
+            for i, embedding in zip(misses, fresh):
+                embeddings[i] = embedding
+                if embedding:
+                    cache.put(self.model_name, texts[i], embedding)
+        
+        return embeddings
+    
     def generate_embeddings_batch(
         self, 
         texts: List[str],
@@ -126,21 +229,28 @@ class EmbeddingGenerator:
         
         logger.info(f"Starting batch embedding generation for {len(texts)} texts")
         
-        embeddings = []
+        embeddings: List[List[float]] = [[] for _ in texts]
         total = len(texts)
         
-        for i, text in enumerate(texts, 1):
+        # Empty texts are rejected by the APIs; they keep an empty embedding
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        
+        for start in range(0, len(indices), EMBEDDING_BATCH_SIZE):
+            batch = indices[start:start + EMBEDDING_BATCH_SIZE]
             try:
-                embedding = self.generate_embedding(text)
-                embeddings.append(embedding)
-                
-                if show_progress and i % 10 == 0:
-                    logger.info(f"Progress: {i}/{total} embeddings generated")
-                    
+                for i, embedding in zip(batch, self._embed_many([texts[i] for i in batch])):
+                    embeddings[i] = embedding
             except Exception as e:
-                logger.error(f"Failed to embed text {i}/{total}: {e}")
-                embeddings.append([])
-                continue
+                # Retry this batch one text at a time so one bad text doesn't sink the rest
+                logger.warning(f"Batch request failed ({e}); embedding {len(batch)} texts individually")
+                for i in batch:
+                    try:
+                        embeddings[i] = self.generate_embedding(texts[i])
+                    except Exception as e:
+                        logger.error(f"Failed to embed text {i + 1}/{total}: {e}")
+            
+            if show_progress:
+                logger.info(f"Progress: {min(start + EMBEDDING_BATCH_SIZE, len(indices))}/{len(indices)} embeddings generated")
         
         successful = sum(1 for e in embeddings if e)
         failed = total - successful
@@ -152,6 +262,27 @@ class EmbeddingGenerator:
         
         return embeddings
     
+    def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed several non-empty texts with a single API request."""
+        if self.provider == "openai":
+            response = self.client.embeddings.create(
+                model=self.model_name,
+                input=texts
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        
+        elif self.provider == "gemini":
+            result = self.client.models.embed_content(
+                model=self.model_name,
+                contents=texts
+            )
+            embeddings = [embedding.values for embedding in result.embeddings]
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        
+        raise ValueError(f"Unsupported provider: {self.provider}")
+    
     def get_embedding_dimension(self) -> int:
         dimensions = {
             "text-embedding-3-small": 1536,